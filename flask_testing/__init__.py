@@ -10,7 +10,9 @@
 """
 
 from __future__ import absolute_import
-from .utils import TestCase, LiveServerTestCase
+from .utils import TestCase, LiveServerTestCase, GCPolicy, make_live_server
+from .snapshot import AppSnapshot
+from .database import TransactionIsolation
 
 try:
     import twill
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.aio
+    ~~~~~~~~~~~~~~~~~
+
+    asyncio clients of the live server, for Python 3.5+.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+import asyncio
+from urllib.parse import unquote, urlparse
+
+from .load import _Recorder
+from .utils import BatchResponse, _UNIX_SOCKET_HOST, _timer
+
+__all__ = ["LiveClient"]
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443, 'http+unix': None}
+
+
+def _encode_request(method, path, host, headers, data):
+    lines = ['%s %s HTTP/1.1' % (method, path), 'Host: %s' % host]
+    for name, value in headers.items():
+        lines.append('%s: %s' % (name, value))
+    if data is not None:
+        lines.append('Content-Length: %d' % len(data))
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin1') + (data or b'')
+
+
+async def _read_chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';', 1)[0], 16)
+        if not size:
+            break
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+
+    # Skip the trailers
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass
+    return b''.join(chunks)
+
+
+async def _read_response(reader, method='GET'):
+    """
+    Reads a response off ``reader``, returning its status, headers, body
+    and whether the connection can be reused.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('The server closed the connection.')
+    version, status = status_line.decode('latin1').rstrip('\r\n').split(None, 1)
+
+    headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers.append((name.strip(), value.strip()))
+
+    fields = dict((name.lower(), value.lower()) for name, value in headers)
+    connection = fields.get('connection', '')
+    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' \
+        else connection != 'close'
+
+    status_code = int(status.split(None, 1)[0])
+    if method == 'HEAD' or status_code in (204, 304) or status_code < 200:
+        body = b''
+    elif fields.get('transfer-encoding') == 'chunked':
+        body = await _read_chunked(reader)
+    elif 'content-length' in fields:
+        body = await reader.readexactly(int(fields['content-length']))
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    return status, headers, body, keep_alive
+
+
+class LiveClient(object):
+    """
+    Sends requests to a live server over the asyncio streams of the
+    standard library, keeping up to ``connections`` connections open to
+    reuse them. Its responses are ``BatchResponse`` objects, so they work
+    with ``assertStatus``, ``assertRedirects`` and the other status
+    assertions, and their ``elapsed`` attribute holds how long, in seconds,
+    the request took.
+
+    Usage::
+
+        async with LiveClient(self.get_server_url()) as client:
+            response = await client.get('/')
+            responses = await client.gather(['/'] * 100)
+
+    :param url: URL of the server, paths are relative to it. The
+                ``http+unix`` scheme, with the percent encoded path of the
+                socket as host, connects to a Unix socket.
+    :param connections: maximum number of requests sent at the same time
+    :param timeout: timeout of each request, in seconds
+    :param headers: dict of headers to send with every request
+    """
+
+    def __init__(self, url, connections=10, timeout=5, headers=None):
+        parts = urlparse(url)
+        if parts.scheme not in _DEFAULT_PORTS:
+            raise ValueError("Unsupported server url scheme: %s" % parts.scheme)
+
+        if parts.scheme == 'http+unix':
+            self.unix_path = unquote(parts.netloc)
+            self.host = self.port = None
+            self._host = _UNIX_SOCKET_HOST
+        else:
+            self.unix_path = None
+            self.host = parts.hostname
+            self.port = parts.port or _DEFAULT_PORTS[parts.scheme]
+            self._host = parts.netloc
+        self.ssl = parts.scheme == 'https' or None
+        self.prefix = parts.path.rstrip('/')
+        self.connections = connections
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._idle = []
+        # Created by the first request, in the loop running it
+        self._slots = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes the connections kept open.
+        """
+        while self._idle:
+            self._idle.pop()[1].close()
+
+    async def _exchange(self, method, payload):
+        while True:
+            reused = bool(self._idle)
+            if reused:
+                reader, writer = self._idle.pop()
+            elif self.unix_path is not None:
+                reader, writer = await asyncio.open_unix_connection(
+                    self.unix_path)
+            else:
+                reader, writer = await asyncio.open_connection(
+                    self.host, self.port, ssl=self.ssl)
+
+            try:
+                writer.write(payload)
+                status, headers, body, keep_alive = await _read_response(
+                    reader, method)
+            except ConnectionError:
+                writer.close()
+                if reused:
+                    # The server closed the idle connection, try another one
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, headers, body
+
+    async def _send(self, request, method, path, headers, data, timeout):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        method = method.upper()
+        if headers:
+            headers = dict(self.headers, **headers)
+        else:
+            headers = self.headers
+        payload = _encode_request(method, self.prefix + path, self._host,
+                                  headers, data)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.connections)
+
+        async with self._slots:
+            start = _timer()
+            status, response_headers, body = await asyncio.wait_for(
+                self._exchange(method, payload),
+                self.timeout if timeout is None else timeout
+            )
+            response = BatchResponse(request, status, response_headers, [body])
+            response.elapsed = _timer() - start
+        return response
+
+    async def request(self, method, path, headers=None, data=None,
+                      timeout=None):
+        """
+        Sends a request and returns its response. Raises
+        ``asyncio.TimeoutError`` when it takes more than ``timeout``
+        seconds.
+
+        :param method: HTTP method of the request
+        :param path: path of the request, with its query string
+        :param headers: dict of headers to send with the request
+        :param data: body of the request, as bytes or text
+        :param timeout: overrides the timeout of the client
+        """
+        return await self._send((method, path), method, path, headers, data,
+                                timeout)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    def _send_request(self, request):
+        if isinstance(request, dict):
+            return self._send(request, request.get('method', 'GET'),
+                              request['path'], request.get('headers'),
+                              request.get('data'), request.get('timeout'))
+
+        if isinstance(request, tuple):
+            method, path = request
+        else:
+            method, path = 'GET', request
+        return self._send(request, method, path, None, None, None)
+
+    async def gather(self, requests):
+        """
+        Sends all the ``requests`` at once, at most ``connections`` at a
+        time, and returns their responses in the same order. Once they are
+        all done, raises the error of the first request that failed, if any.
+
+        :param requests: iterable of paths, ``(method, path)`` tuples or
+                         dicts of arguments for ``request``
+        """
+        responses = await asyncio.gather(
+            *[self._send_request(request) for request in requests],
+            return_exceptions=True
+        )
+        for response in responses:
+            if isinstance(response, BaseException):
+                raise response
+        return responses
+
+
+def _run(coroutine_function):
+    """
+    Runs the coroutine returned by ``coroutine_function`` in a new event
+    loop and returns its result.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        # Create the coroutine within the loop, so it binds to it on
+        # Python < 3.7
+        async def run():
+            return await coroutine_function()
+
+        return loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+def _run_requests(url, requests, connections, timeout, headers):
+    async def run():
+        async with LiveClient(url, connections, timeout, headers) as client:
+            return await client.gather(requests)
+
+    return _run(run)
+
+
+async def _task_client(client, request, budget, recorder):
+    method, path, headers, data = request
+    while budget.take():
+        start = _timer()
+        try:
+            response = await client.request(method, path, headers, data)
+        except (OSError, EOFError, asyncio.TimeoutError, ValueError):
+            recorder.errors += 1
+            continue
+        recorder.record(_timer() - start, response.status_code)
+
+
+def _run_tasks(url, request, budget, concurrency, timeout):
+    recorders = [_Recorder() for _ in range(concurrency)]
+
+    async def run():
+        async with LiveClient(url, concurrency, timeout) as client:
+            await asyncio.gather(*[
+                _task_client(client, request, budget, recorder)
+                for recorder in recorders
+            ])
+
+    start = _timer()
+    _run(run)
+    return recorders, _timer() - start
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.database
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Isolation of the tests sharing a database through transactions rolled
+    back once they are done.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+try:
+    from sqlalchemy import event
+except ImportError:  # pragma: no cover
+    event = None
+
+__all__ = ["TransactionIsolation"]
+
+
+def _raw_connection(connection):
+    """
+    Returns the DBAPI connection behind a SQLAlchemy ``connection``.
+    """
+    fairy = connection.connection
+    return getattr(fairy, 'dbapi_connection', None) or fairy.connection
+
+
+def _emit_begin(connection):
+    # SQLAlchemy < 1.4 has no ``exec_driver_sql``
+    getattr(connection, 'exec_driver_sql', connection.execute)('BEGIN')
+
+
+class TransactionIsolation(object):
+    """
+    Runs each test in a SAVEPOINT rolled back once it's done, when set as
+    the ``database_isolation`` attribute of a ``TestCase``, so tests share
+    a database without seeing each other's data.
+
+    The first test using an app opens a connection and an outer transaction
+    on its engine, and builds the schema in it. They are kept for the
+    following tests sharing the app through ``create_app_scope``, then
+    rolled back and closed once their class or module is done, leaving the
+    database as it was. Without ``create_app_scope``, they are only kept
+    for the test itself.
+
+    During the test ``db.session`` is a session bound to that connection,
+    so the app, ``Model.query`` and the test itself all see the same data.
+    The session commits and rolls back a SAVEPOINT nested in the one of
+    the test, restarted every time, so the whole test is still undone
+    afterwards whatever the app does.
+
+    Usage::
+
+        class MyTest(TestCase):
+            create_app_scope = 'class'
+            database_isolation = TransactionIsolation(db)
+
+    SQLite works through ``pysqlite``, the transactions of which are
+    handled by the isolation for SAVEPOINTs to work. Databases committing
+    DDL statements on their own, like MySQL, need the schema built
+    beforehand with ``create_schema`` disabled.
+
+    Override ``get_engine``, ``build_schema``, ``make_session`` and
+    ``swap_session`` to use SQLAlchemy without Flask-SQLAlchemy.
+
+    :param db: the Flask-SQLAlchemy extension of the app
+    :param create_schema: build the schema in the outer transaction
+    """
+
+    def __init__(self, db, create_schema=True):
+        if event is None:  # pragma: no cover
+            raise ImportError("'sqlalchemy' package is required for %s"
+                              % self.__class__.__name__)
+
+        self.db = db
+        self.create_schema = create_schema
+        #: Connection of the tests to the database
+        self.connection = None
+        #: Session bound to ``connection`` replacing ``db.session``
+        self.session = None
+        self._app = None
+        self._transaction = None
+        self._test_savepoint = None
+        self._savepoint = None
+        self._original_session = None
+        # DBAPI connection of pysqlite and its original isolation level
+        self._sqlite_state = None
+
+    def get_engine(self, app):
+        return self.db.get_engine(app)
+
+    def build_schema(self, connection):
+        self.db.Model.metadata.create_all(bind=connection)
+
+    def make_session(self, connection):
+        # Flask-SQLAlchemy would bind the tables to the engine otherwise
+        return self.db.create_scoped_session(
+            options={'bind': connection, 'binds': {}})
+
+    def swap_session(self, session):
+        """
+        Makes ``session`` the session of the app and returns the previous
+        one.
+        """
+        previous, self.db.session = self.db.session, session
+        return previous
+
+    def begin(self, app):
+        """
+        Opens the connection and outer transaction of the tests of ``app``.
+        """
+        self.release()
+
+        connection = self.get_engine(app).connect()
+        self.connection = connection
+        self._app = app
+
+        if connection.dialect.name == 'sqlite' and \
+                connection.dialect.driver == 'pysqlite':
+            # pysqlite only starts transactions before modifying data and
+            # commits them before other statements, breaking SAVEPOINTs:
+            # emit BEGIN ourselves instead.
+            raw = _raw_connection(connection)
+            self._sqlite_state = (raw, raw.isolation_level)
+            raw.isolation_level = None
+            event.listen(connection, 'begin', _emit_begin)
+
+        self._transaction = connection.begin()
+        if self.create_schema:
+            self.build_schema(connection)
+
+        self.session = self.make_session(connection)
+        event.listen(self.session, 'after_transaction_end',
+                     self._restart_savepoint)
+
+    def release(self, app=None):
+        """
+        Rolls back the outer transaction and closes the connection, if
+        they were opened for ``app`` when given.
+        """
+        if self.connection is None:
+            return
+        if app is not None and app is not self._app:
+            return
+
+        connection = self.connection
+        self.connection = self.session = self._app = None
+        try:
+            if self._transaction.is_active:
+                self._transaction.rollback()
+        finally:
+            self._transaction = None
+            if self._sqlite_state is not None:
+                event.remove(connection, 'begin', _emit_begin)
+                raw, isolation_level = self._sqlite_state
+                raw.isolation_level = isolation_level
+                self._sqlite_state = None
+            connection.close()
+
+    def _restart_savepoint(self, session, transaction):
+        # The session ends the SAVEPOINT of the test it joined when it
+        # commits or rolls back, start the next one
+        if self._savepoint is not None and not self._savepoint.is_active:
+            self._savepoint = self.connection.begin_nested()
+
+    def before_test(self, test):
+        app = test.app
+        if app is not self._app:
+            self.begin(app)
+            scoped = getattr(test, '_scoped_app', None)
+            if scoped is not None:
+                scoped.on_release(lambda: self.release(app))
+
+        # The outer SAVEPOINT undoes the test, the session joins the inner
+        # one and ends it instead of the transaction of the class
+        self._test_savepoint = self.connection.begin_nested()
+        self._savepoint = self.connection.begin_nested()
+        self._original_session = self.swap_session(self.session)
+
+    def after_test(self, test):
+        savepoint, self._savepoint = self._savepoint, None
+        test_savepoint, self._test_savepoint = self._test_savepoint, None
+        try:
+            if self._original_session is not None:
+                self.swap_session(self._original_session)
+                self._original_session = None
+            if self.session is not None:
+                self.session.remove()
+            for savepoint in (savepoint, test_savepoint):
+                if savepoint is not None and savepoint.is_active:
+                    savepoint.rollback()
+        finally:
+            if getattr(test, '_scoped_app', None) is None:
+                self.release()
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.load
+    ~~~~~~~~~~~~~~~~~~
+
+    Load tests measuring the throughput and latency of a live server.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import json
+import math
+import os
+import socket
+import sys
+import threading
+
+try:
+    from http.client import HTTPException
+except ImportError:
+    # Python 2 httplib fallback
+    from httplib import HTTPException
+
+from .utils import LiveServerTestCase, _server_connection, _timer
+
+#: Environment variable making ``assertNoRegression`` overwrite the
+#: baseline files with the current results instead of checking them.
+UPDATE_BASELINES_ENV = 'FLASK_TESTING_UPDATE_BASELINES'
+
+__all__ = ["LoadTestCase", "LoadResult"]
+
+
+class LoadResult(object):
+    """
+    Latencies, in seconds, and outcomes of the requests sent by
+    ``LoadTestCase.run_load``.
+    """
+
+    def __init__(self, latencies, statuses, errors, elapsed, concurrency):
+        self.latencies = sorted(latencies)
+        #: Number of responses per status code
+        self.statuses = statuses
+        #: Number of requests that failed without a response
+        self.errors = errors
+        #: Wall time of the whole run, in seconds
+        self.elapsed = elapsed
+        self.concurrency = concurrency
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def requests_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.requests / self.elapsed
+
+    def percentile(self, percent):
+        """
+        Returns the latency below which ``percent`` percents of the
+        requests completed, using the nearest rank.
+        """
+        if not self.latencies:
+            return None
+        rank = int(math.ceil(percent / 100.0 * len(self.latencies)))
+        return self.latencies[max(rank, 1) - 1]
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p95(self):
+        return self.percentile(95)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'concurrency': self.concurrency,
+            'elapsed': self.elapsed,
+            'requests_per_second': self.requests_per_second,
+            'p50': self.p50,
+            'p95': self.p95,
+            'p99': self.p99,
+            'statuses': dict((str(status), count)
+                             for status, count in self.statuses.items()),
+        }
+
+    def summary(self):
+        if not self.latencies:
+            return '0 requests, %d errors' % self.errors
+        return (
+            '%d requests (%d errors) with %d clients in %.2fs: %.1f req/s, '
+            'p50 %.2fms, p95 %.2fms, p99 %.2fms' % (
+                self.requests, self.errors, self.concurrency, self.elapsed,
+                self.requests_per_second, self.p50 * 1e3, self.p95 * 1e3,
+                self.p99 * 1e3,
+            )
+        )
+
+
+class _Budget(object):
+    """
+    Hands out the requests of a run to the clients, either a fixed number
+    of them or as many as fit before a deadline.
+    """
+
+    def __init__(self, requests, duration):
+        self._lock = threading.Lock()
+        self._remaining = requests
+        self._deadline = None
+        if duration is not None:
+            self._deadline = _timer() + duration
+
+    def take(self):
+        if self._deadline is not None:
+            return _timer() < self._deadline
+
+        with self._lock:
+            if self._remaining <= 0:
+                return False
+            self._remaining -= 1
+            return True
+
+
+class _Recorder(object):
+    """
+    Outcomes recorded by a single client, merged once the run is over so
+    clients never contend for them.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, latency, status):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+def _merge(recorders, elapsed, concurrency):
+    latencies = []
+    statuses = {}
+    errors = 0
+    for recorder in recorders:
+        latencies.extend(recorder.latencies)
+        for status, count in recorder.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+        errors += recorder.errors
+    return LoadResult(latencies, statuses, errors, elapsed, concurrency)
+
+
+def _thread_client(url, request, budget, recorder, timeout):
+    method, path, headers, data = request
+    connection = _server_connection(url, timeout)
+    try:
+        while budget.take():
+            start = _timer()
+            try:
+                connection.request(method, path, data, headers)
+                response = connection.getresponse()
+                response.read()
+            except (socket.error, HTTPException):
+                connection.close()
+                recorder.errors += 1
+                continue
+            recorder.record(_timer() - start, response.status)
+    finally:
+        connection.close()
+
+
+def _run_threads(url, request, budget, concurrency, timeout):
+    recorders = [_Recorder() for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=_thread_client,
+                         args=(url, request, budget, recorder, timeout))
+        for recorder in recorders
+    ]
+
+    start = _timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorders, _timer() - start
+
+
+class LoadTestCase(LiveServerTestCase):
+    """
+    A ``LiveServerTestCase`` sending many concurrent requests to its live
+    server to measure its throughput and latency::
+
+        class TestIndexLoad(LoadTestCase):
+
+            def create_app(self):
+                return create_app()
+
+            def test_index(self):
+                result = self.run_load('/', requests=2000, concurrency=8)
+                self.assertLatencyBelow(result, 0.05, percentile=99)
+                self.assertNoRegression(result)
+    """
+
+    #: Number of clients sending requests at the same time
+    load_concurrency = 4
+
+    #: Sends the requests from ``'thread'`` clients or ``'asyncio'``
+    #: tasks (Python 3.5+)
+    load_client = 'thread'
+
+    #: Timeout, in seconds, of each request
+    load_timeout = 10
+
+    #: Directory of the baseline files of ``assertNoRegression``
+    load_baseline_dir = None
+
+    #: How much slower than its baseline, as a fraction, a run can get
+    #: before ``assertNoRegression`` fails
+    load_regression_tolerance = 0.2
+
+    #: Print a summary of each run on stderr
+    load_report = True
+
+    def run_load(self, path='/', requests=1000, duration=None,
+                 concurrency=None, method='GET', headers=None, data=None,
+                 warmup=0):
+        """
+        Sends ``requests`` requests, or as many as possible during
+        ``duration`` seconds, to ``path`` on the live server, from
+        ``concurrency`` clients at the same time, and returns a
+        ``LoadResult``.
+
+        :param path: path of the requests, with its query string
+        :param requests: number of requests to send
+        :param duration: send requests for this many seconds instead
+        :param concurrency: number of clients, ``load_concurrency`` by default
+        :param method: HTTP method of the requests
+        :param headers: dict of headers to send with each request
+        :param data: body of the requests, as bytes
+        :param warmup: number of requests to send before measuring
+        """
+        concurrency = concurrency or self.load_concurrency
+        url = self.get_server_url()
+        request = (method, path, dict(headers or {}), data)
+
+        if self.load_client == 'thread':
+            run = _run_threads
+        elif self.load_client == 'asyncio':
+            from .aio import _run_tasks as run
+        else:
+            raise ValueError(
+                "Unknown load_client %r, expected 'thread' or 'asyncio'."
+                % (self.load_client,)
+            )
+
+        if warmup:
+            run(url, request, _Budget(warmup, None), concurrency,
+                self.load_timeout)
+
+        recorders, elapsed = run(url, request, _Budget(requests, duration),
+                                 concurrency, self.load_timeout)
+        result = _merge(recorders, elapsed, concurrency)
+
+        if self.load_report:
+            sys.stderr.write('\n%s %s %s: %s\n' % (
+                self.id(), method, path, result.summary()))
+        return result
+
+    def assertLatencyBelow(self, result, seconds, percentile=95, message=None):
+        """
+        Checks that the given percentile of the latencies of a load run is
+        below ``seconds``.
+
+        :param result: ``LoadResult`` returned by ``run_load``
+        :param seconds: latency limit, in seconds
+        :param percentile: percentile of the latencies to check
+        :param message: Message to display on test failure
+        """
+        latency = result.percentile(percentile)
+        if latency is None or latency >= seconds:
+            self.fail(message or 'p%s latency of %s exceeds %.2fms' % (
+                percentile,
+                'no request' if latency is None else '%.2fms' % (latency * 1e3),
+                seconds * 1e3,
+            ))
+
+    assert_latency_below = assertLatencyBelow
+
+    def assertThroughputAbove(self, result, requests_per_second, message=None):
+        """
+        Checks that a load run served more than ``requests_per_second``.
+
+        :param result: ``LoadResult`` returned by ``run_load``
+        :param requests_per_second: throughput limit
+        :param message: Message to display on test failure
+        """
+        if result.requests_per_second <= requests_per_second:
+            self.fail(message or 'Throughput of %.1f req/s is below %.1f req/s' % (
+                result.requests_per_second, requests_per_second))
+
+    assert_throughput_above = assertThroughputAbove
+
+    def _baseline_path(self, name):
+        if self.load_baseline_dir is None:
+            raise RuntimeError(
+                "Set load_baseline_dir to compare load runs to baselines."
+            )
+        return os.path.join(self.load_baseline_dir, '%s.json' % (name or self.id()))
+
+    def assertNoRegression(self, result, name=None, message=None):
+        """
+        Checks that a load run is no slower than the baseline stored in
+        ``load_baseline_dir``, within ``load_regression_tolerance``, both in
+        p95 latency and in throughput. The baseline is written by the first
+        run, or by any run when ``FLASK_TESTING_UPDATE_BASELINES`` is set.
+
+        :param result: ``LoadResult`` returned by ``run_load``
+        :param name: name of the baseline file, the test id by default
+        :param message: Message to display on test failure
+        """
+        path = self._baseline_path(name)
+
+        if os.environ.get(UPDATE_BASELINES_ENV) or not os.path.exists(path):
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(path, 'w') as baseline_file:
+                json.dump(result.to_dict(), baseline_file, indent=2, sort_keys=True)
+            return
+
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        tolerance = self.load_regression_tolerance
+        regressions = []
+        if baseline.get('p95') and result.p95 is not None \
+                and result.p95 > baseline['p95'] * (1 + tolerance):
+            regressions.append('p95 latency %.2fms, baseline %.2fms' % (
+                result.p95 * 1e3, baseline['p95'] * 1e3))
+        if baseline.get('requests_per_second') and result.requests_per_second \
+                < baseline['requests_per_second'] * (1 - tolerance):
+            regressions.append('throughput %.1f req/s, baseline %.1f req/s' % (
+                result.requests_per_second, baseline['requests_per_second']))
+
+        if regressions:
+            self.fail(message or 'Load regression against %s: %s' % (
+                path, '; '.join(regressions)))
+
+    assert_no_regression = assertNoRegression
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.memory
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Memory retained by test cases, measured with ``tracemalloc``.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import atexit
+import json
+import os
+import sys
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    # Python < 3.4
+    tracemalloc = None
+
+#: Environment variable enabling memory profiling for every test case. Set
+#: it to ``1`` to print the tests retaining the most memory at the end of
+#: the run, or to a path to write a JSON report there.
+MEMORY_ENV = 'FLASK_TESTING_MEMORY'
+
+#: Number of allocation sites kept for each test
+TOP_SITES = 10
+
+__all__ = ["MemoryProfiles", "memory_profiles"]
+
+
+def _filter(snapshot):
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+
+
+class _MemoryProfile(object):
+    """
+    Snapshots the traced memory when a test starts, to compare it to the
+    memory still allocated once the test is torn down.
+    """
+
+    def __init__(self, requests=False):
+        # Only stop tracing afterwards if the profile started it
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self.requests = [] if requests else None
+        self._request_start = None
+        self._before = _filter(tracemalloc.take_snapshot())
+
+    def request_started(self):
+        if self.requests is not None:
+            self._request_start = tracemalloc.get_traced_memory()[0]
+
+    def request_finished(self, endpoint):
+        if self.requests is not None and self._request_start is not None:
+            allocated = tracemalloc.get_traced_memory()[0] - self._request_start
+            self.requests.append({'endpoint': endpoint, 'allocated': allocated})
+            self._request_start = None
+
+    def finish(self):
+        """
+        Returns the bytes allocated since the test started and still
+        allocated, and the allocation sites retaining the most of them.
+        """
+        try:
+            after = _filter(tracemalloc.take_snapshot())
+        finally:
+            self.stop()
+        stats = after.compare_to(self._before, 'lineno')
+        self._before = None
+
+        retained = sum(stat.size_diff for stat in stats)
+        sites = [
+            {
+                'site': '%s:%s' % (stat.traceback[0].filename,
+                                   stat.traceback[0].lineno),
+                'size': stat.size_diff,
+                'count': stat.count_diff,
+            }
+            for stat in stats[:TOP_SITES] if stat.size_diff > 0
+        ]
+        return retained, sites
+
+    def stop(self):
+        """
+        Stops tracing memory, if the profile started it.
+        """
+        if self._started_tracing:
+            self._started_tracing = False
+            tracemalloc.stop()
+
+
+class MemoryProfiles(object):
+    """
+    Collects the memory retained, in bytes, by the tests run with
+    ``memory_profile`` enabled.
+    """
+
+    def __init__(self):
+        self.tests = []
+
+    def record(self, test, retained, sites, requests=None):
+        cls = type(test)
+        entry = {
+            'test': test.id(),
+            'class': '%s.%s' % (cls.__module__, cls.__name__),
+            'retained': retained,
+            'sites': sites,
+        }
+        if requests is not None:
+            entry['requests'] = requests
+        self.tests.append(entry)
+        return entry
+
+    def clear(self):
+        del self.tests[:]
+
+    def largest(self, count=10):
+        """
+        Returns the ``count`` tests that retained the most memory.
+        """
+        return sorted(self.tests, key=lambda entry: entry['retained'],
+                      reverse=True)[:count]
+
+    def to_json(self):
+        return json.dumps({'tests': self.tests}, indent=2, sort_keys=True)
+
+    def summary(self, count=10):
+        lines = ['Tests retaining the most memory (KiB):']
+        for entry in self.largest(count):
+            lines.append('  %9.1f  %s' % (entry['retained'] / 1024.0, entry['test']))
+            for site in entry['sites'][:3]:
+                lines.append('  %9.1f    %s' % (site['size'] / 1024.0, site['site']))
+        return '\n'.join(lines)
+
+
+#: Memory profiles recorded by the test cases of this process
+memory_profiles = MemoryProfiles()
+
+_report_registered = False
+
+
+def _report():
+    if not memory_profiles.tests:
+        return
+
+    target = os.environ.get(MEMORY_ENV)
+    if target in (None, '', '1'):
+        sys.stderr.write('\n%s\n' % memory_profiles.summary())
+    else:
+        with open(target, 'w') as report:
+            report.write(memory_profiles.to_json())
+
+
+def profiling_enabled(test):
+    return bool(test.memory_profile) or bool(os.environ.get(MEMORY_ENV))
+
+
+def start_memory_profile(test):
+    """
+    Returns the memory profile of ``test``, or ``None`` when profiling is
+    disabled.
+    """
+    global _report_registered
+
+    if not profiling_enabled(test):
+        return None
+
+    if tracemalloc is None:  # pragma: no cover
+        raise RuntimeError("Memory profiling requires Python 3.4+.")
+
+    if os.environ.get(MEMORY_ENV) and not _report_registered:
+        atexit.register(_report)
+        _report_registered = True
+
+    return _MemoryProfile(requests=test.memory_profile == 'requests')
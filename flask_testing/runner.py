@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.runner
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Runs unittest suites across several worker processes.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import argparse
+import multiprocessing
+import os
+import sys
+import traceback
+
+try:
+    import queue
+except ImportError:
+    # Python 2 Queue fallback
+    import Queue as queue
+
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from .utils import WORKER_ID_ENV, _live_servers, _scoped_apps, _timer
+
+__all__ = ["ParallelTestRunner"]
+
+#: Seconds a worker may go without reporting the outcome of a test before
+#: it's considered stuck and terminated.
+DEFAULT_TIMEOUT = 300
+
+
+class RemoteTraceback(Exception):
+    """
+    Stands in for an exception raised in a worker process, carrying its
+    formatted traceback.
+    """
+
+    def __str__(self):
+        return '\n%s' % self.args[0]
+
+
+class _RemoteTest(object):
+    """
+    Stands in for errors that aren't bound to one test, such as a failing
+    ``setUpClass`` or a crashed worker.
+    """
+
+    def __init__(self, description):
+        self.description = description
+
+    def id(self):
+        return self.description
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self.description
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for subtest in _iter_tests(test):
+                yield subtest
+        else:
+            yield test
+
+
+def _partition(tests, workers):
+    """
+    Splits ``tests`` into ``workers`` chunks of ``(index, test)`` pairs,
+    keeping the tests of a class together so class fixtures and scoped
+    apps are only set up by a single worker.
+    """
+    groups = []
+    by_class = {}
+    for index, test in enumerate(tests):
+        cls = type(test)
+        if cls not in by_class:
+            by_class[cls] = []
+            groups.append(by_class[cls])
+        by_class[cls].append((index, test))
+
+    chunks = [[] for _ in range(workers)]
+    for group in sorted(groups, key=len, reverse=True):
+        min(chunks, key=len).extend(group)
+
+    # Restore the original order so modules and classes run one after the
+    # other within each worker.
+    return [sorted(chunk, key=lambda pair: pair[0]) for chunk in chunks if chunk]
+
+
+class _WorkerResult(unittest.TestResult):
+    """
+    Records the outcomes of the tests run by a worker and sends them to
+    the parent process once each test is done.
+    """
+
+    def __init__(self, worker_id, results, indexes):
+        super(_WorkerResult, self).__init__()
+        self._worker_id = worker_id
+        self._results = results
+        self._indexes = indexes
+        self._events = None
+
+    def _format(self, err):
+        return ''.join(traceback.format_exception(*err))
+
+    def _record(self, test, outcome, payload=None):
+        if self._events is None:
+            # Errors raised outside of a test, e.g. in setUpClass
+            self._results.put(
+                (self._worker_id, (None, str(test), [(outcome, payload)])))
+        else:
+            self._events.append((outcome, payload))
+
+    def startTest(self, test):
+        super(_WorkerResult, self).startTest(test)
+        self._events = []
+
+    def stopTest(self, test):
+        super(_WorkerResult, self).stopTest(test)
+        self._results.put((self._worker_id,
+                           (self._indexes[id(test)], str(test), self._events)))
+        self._events = None
+
+    def addSuccess(self, test):
+        self._record(test, 'success')
+
+    def addError(self, test, err):
+        self._record(test, 'error', self._format(err))
+
+    def addFailure(self, test, err):
+        self._record(test, 'failure', self._format(err))
+
+    def addSkip(self, test, reason):
+        self._record(test, 'skip', reason)
+
+    def addExpectedFailure(self, test, err):
+        self._record(test, 'expected_failure', self._format(err))
+
+    def addUnexpectedSuccess(self, test):
+        self._record(test, 'unexpected_success')
+
+    def addSubTest(self, test, subtest, err):
+        if err is not None:
+            outcome = 'failure'
+            if not issubclass(err[0], test.failureException):
+                outcome = 'error'
+            self._record(test, outcome, '%s\n%s' % (subtest, self._format(err)))
+
+
+def _run_worker(worker_id, chunk, results):
+    os.environ[WORKER_ID_ENV] = str(worker_id)
+
+    # The servers and apps shared by the tests of the parent process were
+    # forked along with it, but their threads weren't: forget them without
+    # stopping them, which is up to the parent.
+    _live_servers.clear()
+    _scoped_apps.clear()
+
+    indexes = dict((id(test), index) for index, test in chunk)
+    suite = unittest.TestSuite([test for _, test in chunk])
+    suite.run(_WorkerResult(worker_id, results, indexes))
+    results.put((worker_id, None))
+
+
+def _replay(result, test, events):
+    result.startTest(test)
+    for outcome, payload in events:
+        if outcome == 'success':
+            result.addSuccess(test)
+        elif outcome in ('error', 'failure', 'expected_failure'):
+            err = (RemoteTraceback, RemoteTraceback(payload), None)
+            if outcome == 'error':
+                result.addError(test, err)
+            elif outcome == 'failure':
+                result.addFailure(test, err)
+            else:
+                result.addExpectedFailure(test, err)
+        elif outcome == 'skip':
+            result.addSkip(test, payload)
+        elif outcome == 'unexpected_success':
+            result.addUnexpectedSuccess(test)
+    result.stopTest(test)
+
+
+class _Worker(object):
+    """
+    A worker process, along with the indexes of the tests it hasn't
+    reported yet, in the order it runs them.
+    """
+
+    def __init__(self, process, pending):
+        self.process = process
+        self.pending = pending
+        self.last_report = _timer()
+
+
+class _ParallelSuite(object):
+    """
+    Runs the tests of ``suite`` in ``workers`` forked processes and merges
+    their outcomes into the result passed by the test runner.
+    """
+
+    def __init__(self, suite, workers, timeout=DEFAULT_TIMEOUT):
+        self.suite = suite
+        self.workers = workers
+        self.timeout = timeout
+
+    def _check_workers(self, workers, tests, result):
+        """
+        Reports and forgets the workers which crashed or didn't report
+        anything for longer than the timeout.
+        """
+        now = _timer()
+        for worker_id, worker in list(workers.items()):
+            process = worker.process
+            if not process.is_alive() and process.exitcode != 0:
+                del workers[worker_id]
+                description = 'worker process %s' % process.name
+                _replay(result, _RemoteTest(description), [(
+                    'error',
+                    'The worker exited with code %s before finishing '
+                    'its tests.' % process.exitcode
+                )])
+            elif self.timeout is not None \
+                    and now - worker.last_report > self.timeout:
+                del workers[worker_id]
+                process.terminate()
+                process.join()
+                if worker.pending:
+                    # Tests run in order, so the first one pending is stuck
+                    test = tests[worker.pending[0]]
+                else:
+                    test = _RemoteTest('worker process %s' % process.name)
+                _replay(result, test, [(
+                    'error',
+                    'The worker reported nothing for %s seconds and was '
+                    'terminated, %d of its tests didn\'t run.'
+                    % (self.timeout, len(worker.pending))
+                )])
+
+    def __call__(self, result):
+        tests = list(_iter_tests(self.suite))
+        results = multiprocessing.Queue()
+
+        workers = {}
+        for worker_id, chunk in enumerate(_partition(tests, self.workers)):
+            process = multiprocessing.Process(
+                target=_run_worker, args=(worker_id, chunk, results)
+            )
+            process.start()
+            workers[worker_id] = _Worker(
+                process, [index for index, _ in chunk])
+        processes = [worker.process for worker in workers.values()]
+
+        while workers:
+            try:
+                worker_id, message = results.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers(workers, tests, result)
+                continue
+
+            worker = workers.get(worker_id)
+            if worker is None:
+                # Reported before the worker was terminated
+                continue
+            worker.last_report = _timer()
+
+            if message is None:
+                del workers[worker_id]
+                continue
+
+            index, description, events = message
+            if index is None:
+                test = _RemoteTest(description)
+            else:
+                test = tests[index]
+                worker.pending.remove(index)
+            _replay(result, test, events)
+
+        for process in processes:
+            process.join()
+
+        return result
+
+
+class ParallelTestRunner(unittest.TextTestRunner):
+    """
+    A ``TextTestRunner`` that distributes the tests across ``workers``
+    processes, one per CPU by default.
+
+    Each worker runs its tests with ``worker_id`` set on the test cases and
+    ``LiveServerTestCase`` binding its server to an OS assigned port, so
+    tests running at the same time don't collide. The worker processes are
+    forked, so this requires a platform supporting ``fork``.
+
+    A worker which doesn't report the outcome of a test for ``timeout``
+    seconds is terminated, and the test it was running reported as an
+    error. Set ``timeout`` to ``None`` to wait for tests however long they
+    take.
+
+    Usage::
+
+        ParallelTestRunner(workers=4, verbosity=2).run(suite)
+    """
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        super(ParallelTestRunner, self).__init__(**kwargs)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.timeout = timeout
+
+    def run(self, test):
+        return super(ParallelTestRunner, self).run(
+            _ParallelSuite(test, self.workers, self.timeout)
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m flask_testing.runner',
+        description='Run unittest tests across several worker processes.'
+    )
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds a worker may spend on a test before it '
+                             'is terminated (default: %(default)s)')
+    parser.add_argument('-v', '--verbose', action='store_const', const=2,
+                        default=1, dest='verbosity')
+    parser.add_argument('tests', nargs='*',
+                        help='test modules, classes or methods '
+                             '(default: discover tests in the current '
+                             'directory)')
+    args = parser.parse_args(argv)
+
+    loader = unittest.TestLoader()
+    if args.tests:
+        suite = loader.loadTestsFromNames(args.tests)
+    else:
+        suite = loader.discover('.')
+
+    runner = ParallelTestRunner(workers=args.workers, timeout=args.timeout,
+                                verbosity=args.verbosity)
+    result = runner.run(suite)
+    sys.exit(not result.wasSuccessful())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.snapshot
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    Snapshots of the state of an application, restored between the tests
+    sharing it.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+__all__ = ["AppSnapshot"]
+
+# Mappings of the application restored key by key
+_MAPPINGS = ('config', 'extensions')
+
+# Mappings of the Jinja environment restored key by key
+_JINJA_MAPPINGS = ('globals', 'filters')
+
+# Hooks of the application, either lists of functions or dicts of lists of
+# functions keyed by blueprint
+_HOOK_REGISTRIES = (
+    'before_request_funcs',
+    'after_request_funcs',
+    'teardown_request_funcs',
+    'teardown_appcontext_funcs',
+    'url_value_preprocessors',
+    'url_default_functions',
+    'template_context_processors',
+)
+
+
+def _restore_mapping(mapping, saved):
+    """
+    Puts back the ``saved`` items of ``mapping``, only touching the keys
+    whose value was replaced, added or removed. Values are compared by
+    identity, so values mutated in place aren't noticed. Returns whether
+    anything changed.
+    """
+    changed = False
+
+    if len(mapping) != len(saved) or any(key not in saved for key in mapping):
+        for key in [key for key in mapping if key not in saved]:
+            del mapping[key]
+        changed = True
+
+    missing = object()
+    for key, value in saved.items():
+        if mapping.get(key, missing) is not value:
+            mapping[key] = value
+            changed = True
+
+    return changed
+
+
+def _same_functions(functions, saved):
+    return len(functions) == len(saved) and all(
+        function is saved_function
+        for function, saved_function in zip(functions, saved)
+    )
+
+
+def _snapshot_hooks(registry):
+    if isinstance(registry, dict):
+        return dict((key, tuple(functions)) for key, functions in registry.items())
+    return tuple(registry)
+
+
+def _restore_hooks(registry, saved):
+    if not isinstance(registry, dict):
+        if _same_functions(registry, saved):
+            return False
+        registry[:] = saved
+        return True
+
+    changed = False
+    for key in [key for key in registry if key not in saved]:
+        del registry[key]
+        changed = True
+
+    for key, functions in saved.items():
+        current = registry.get(key)
+        if current is None:
+            registry[key] = list(functions)
+            changed = True
+        elif not _same_functions(current, functions):
+            current[:] = functions
+            changed = True
+
+    return changed
+
+
+class AppSnapshot(object):
+    """
+    Captures the parts of an application tests usually change, so they can
+    be put back after each test without building the application again:
+
+    * ``app.config`` and ``app.extensions``
+    * the ``before_request``, ``after_request``, ``teardown_request`` and
+      ``teardown_appcontext`` hooks, URL processors and template context
+      processors
+    * the globals and filters of ``app.jinja_env``
+
+    Only references are copied, and restoring compares them by identity to
+    only put back what was replaced, added or removed. Values changed in
+    place, such as a list in the config or the state of an extension, are
+    not restored.
+
+    Usage::
+
+        snapshot = AppSnapshot(app)
+        ...
+        snapshot.restore()
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.mappings = dict(
+            (name, dict(getattr(app, name)))
+            for name in _MAPPINGS if hasattr(app, name)
+        )
+        jinja_env = app.jinja_env
+        self.jinja_mappings = dict(
+            (name, dict(getattr(jinja_env, name))) for name in _JINJA_MAPPINGS
+        )
+        self.hooks = dict(
+            (name, _snapshot_hooks(getattr(app, name)))
+            for name in _HOOK_REGISTRIES if hasattr(app, name)
+        )
+
+    def restore(self):
+        """
+        Restores the application to the state it was in when the snapshot
+        was taken, and returns the names of the parts that had changed.
+        """
+        app = self.app
+        changed = []
+
+        for name, saved in self.mappings.items():
+            if _restore_mapping(getattr(app, name), saved):
+                changed.append(name)
+
+        jinja_env = app.jinja_env
+        for name, saved in self.jinja_mappings.items():
+            if _restore_mapping(getattr(jinja_env, name), saved):
+                changed.append('jinja_env.%s' % name)
+
+        for name, saved in self.hooks.items():
+            if _restore_hooks(getattr(app, name), saved):
+                changed.append(name)
+
+        return sorted(changed)
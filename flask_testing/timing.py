@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+    flask_testing.timing
+    ~~~~~~~~~~~~~~~~~~~~
+
+    Timings of the setup and teardown phases of test cases.
+
+    :copyright: (c) 2010 by Dan Jacob.
+    :license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import atexit
+import json
+import os
+import sys
+import time
+
+#: Environment variable enabling timings for every test case. Set it to
+#: ``1`` to print the slowest setups at the end of the run, or to a path
+#: to write a JSON report there.
+TIMINGS_ENV = 'FLASK_TESTING_TIMINGS'
+
+#: Phases making up the setup of a test, in the order they run
+SETUP_PHASES = ('create_app', 'client', 'context', 'database', 'signals')
+
+#: All the phases recorded for a test, in the order they run
+PHASES = SETUP_PHASES + ('test', 'teardown', 'gc')
+
+try:
+    _timer_ns = time.perf_counter_ns
+except AttributeError:  # pragma: no cover
+    # Python < 3.7
+    _clock = getattr(time, 'perf_counter', time.time)
+
+    def _timer_ns():
+        return int(_clock() * 1e9)
+
+__all__ = ["PhaseTimings", "RequestTimings", "phase_timings",
+           "request_timings"]
+
+
+class _PhaseTimer(object):
+    """
+    Measures the time elapsed between consecutive ``mark`` calls, each
+    closing the named phase.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._last = _timer_ns()
+
+    def mark(self, phase):
+        now = _timer_ns()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self._last
+        self._last = now
+
+
+class _NullPhaseTimer(object):
+    """
+    Used when timings are disabled, so instrumented code doesn't have to
+    check for it.
+    """
+
+    phases = None
+
+    def mark(self, phase):
+        pass
+
+
+_null_phase_timer = _NullPhaseTimer()
+
+
+class PhaseTimings(object):
+    """
+    Collects the phase timings, in nanoseconds, of the tests run with
+    ``record_timings`` enabled.
+    """
+
+    def __init__(self):
+        self.tests = []
+
+    def record(self, test, phases):
+        cls = type(test)
+        self.tests.append({
+            'test': test.id(),
+            'class': '%s.%s' % (cls.__module__, cls.__name__),
+            'phases': phases,
+        })
+
+    def clear(self):
+        del self.tests[:]
+
+    def by_class(self):
+        """
+        Returns the number of tests and the total time spent in each phase,
+        per test class.
+        """
+        classes = {}
+        for entry in self.tests:
+            totals = classes.setdefault(entry['class'], {'tests': 0})
+            totals['tests'] += 1
+            for phase, elapsed in entry['phases'].items():
+                totals[phase] = totals.get(phase, 0) + elapsed
+        return classes
+
+    def slowest_setups(self, count=10):
+        """
+        Returns the ``count`` tests that took the longest to set up, as
+        ``(setup time, entry)`` pairs.
+        """
+        setups = [
+            (sum(entry['phases'].get(phase, 0) for phase in SETUP_PHASES), entry)
+            for entry in self.tests
+        ]
+        setups.sort(key=lambda setup: setup[0], reverse=True)
+        return setups[:count]
+
+    def to_dict(self):
+        return {
+            'tests': self.tests,
+            'classes': self.by_class(),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def summary(self, count=10):
+        lines = ['Slowest test setups (ms):']
+        for setup, entry in self.slowest_setups(count):
+            phases = ', '.join(
+                '%s %.2f' % (phase, entry['phases'][phase] / 1e6)
+                for phase in SETUP_PHASES if phase in entry['phases']
+            )
+            lines.append('  %9.2f  %s (%s)' % (setup / 1e6, entry['test'], phases))
+        return '\n'.join(lines)
+
+
+class RequestTimings(object):
+    """
+    Collects the wall and CPU time, in seconds, and the number of queries
+    of the requests sent by the test clients, per endpoint.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+
+    def record(self, endpoint, elapsed, cpu_time, query_count=None):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = {
+                'requests': 0, 'elapsed': 0.0, 'max_elapsed': 0.0,
+                'cpu_time': 0.0, 'queries': 0,
+            }
+        stats['requests'] += 1
+        stats['elapsed'] += elapsed
+        stats['max_elapsed'] = max(stats['max_elapsed'], elapsed)
+        stats['cpu_time'] += cpu_time
+        if query_count:
+            stats['queries'] += query_count
+
+    def clear(self):
+        self.endpoints.clear()
+
+    def slowest(self, count=10):
+        """
+        Returns the ``count`` endpoints that took the longest on average,
+        as ``(endpoint, stats)`` pairs.
+        """
+        endpoints = sorted(
+            self.endpoints.items(),
+            key=lambda item: item[1]['elapsed'] / item[1]['requests'],
+            reverse=True
+        )
+        return endpoints[:count]
+
+    def summary(self, count=10):
+        lines = ['Slowest endpoints (ms):']
+        for endpoint, stats in self.slowest(count):
+            requests = stats['requests']
+            lines.append(
+                '  %9.2f  %s (%d requests, max %.2f, cpu %.2f, %.1f queries)' % (
+                    stats['elapsed'] / requests * 1e3, endpoint, requests,
+                    stats['max_elapsed'] * 1e3,
+                    stats['cpu_time'] / requests * 1e3,
+                    stats['queries'] / float(requests),
+                )
+            )
+        return '\n'.join(lines)
+
+
+#: Timings recorded by the test cases of this process
+phase_timings = PhaseTimings()
+
+#: Timings of the requests sent by the test clients of this process
+request_timings = RequestTimings()
+
+_report_registered = False
+
+
+def _report():
+    if not phase_timings.tests and not request_timings.endpoints:
+        return
+
+    target = os.environ.get(TIMINGS_ENV)
+    if target in (None, '', '1'):
+        if phase_timings.tests:
+            sys.stderr.write('\n%s\n' % phase_timings.summary())
+        if request_timings.endpoints:
+            sys.stderr.write('\n%s\n' % request_timings.summary())
+    else:
+        report = phase_timings.to_dict()
+        report['endpoints'] = request_timings.endpoints
+        with open(target, 'w') as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+
+
+def timings_enabled(test):
+    return test.record_timings or bool(os.environ.get(TIMINGS_ENV))
+
+
+def start_phase_timer(test):
+    """
+    Returns the timer measuring the phases of ``test``, which does
+    nothing when timings are disabled.
+    """
+    global _report_registered
+
+    if not timings_enabled(test):
+        return _null_phase_timer
+
+    if os.environ.get(TIMINGS_ENV) and not _report_registered:
+        atexit.register(_report)
+        _report_registered = True
+
+    return _PhaseTimer()
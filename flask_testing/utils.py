@@ -12,8 +12,18 @@ from __future__ import absolute_import, with_statement
 
 import gc
 import multiprocessing
+import os
+import shutil
+import signal
 import socket
+import sys
+import tempfile
+import threading
 import time
+import warnings
+import weakref
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
 
 try:
     import socketserver
@@ -27,15 +37,49 @@ except ImportError:
     import unittest
 
 try:
-    from urllib.parse import urlparse, urljoin
+    from http.client import HTTPConnection, HTTPSConnection
+except ImportError:
+    # Python 2
+    from httplib import HTTPConnection, HTTPSConnection
+
+try:
+    from urllib.parse import urlparse, urljoin, quote, unquote, \
+        unquote_to_bytes
 except ImportError:
     # Python 2 urlparse fallback
     from urlparse import urlparse, urljoin
+    from urllib import quote, unquote
+    from urllib import unquote as unquote_to_bytes
 
+from werkzeug.datastructures import Headers
+from werkzeug.serving import BaseWSGIServer, ForkingWSGIServer, \
+    ThreadedWSGIServer, WSGIRequestHandler
+from werkzeug.test import run_wsgi_app
 from werkzeug.utils import cached_property
+from werkzeug.wsgi import LimitedStream
 
 # Use Flask's preferred JSON module so that our runtime behavior matches.
-from flask import templating, template_rendered
+from flask import request, request_finished, templating, template_rendered
+
+try:
+    from flask.testing import EnvironBuilder
+except ImportError:  # pragma: no cover
+    # Flask < 1.0
+    from flask.testing import make_test_environ_builder as EnvironBuilder
+
+try:
+    from flask.globals import _cv_request
+except ImportError:
+    from flask.globals import _request_ctx_stack
+else:  # pragma: no cover
+    # Flask 2.2+ keeps the contexts in context variables, where the lazy
+    # request context can't stand in
+    _request_ctx_stack = None
+
+from .timing import phase_timings, request_timings, start_phase_timer, \
+    _null_phase_timer
+from .memory import memory_profiles, start_memory_profile
+from .snapshot import AppSnapshot
 
 try:
     from flask import message_flashed
@@ -62,6 +106,16 @@ try:
 except ImportError:  # pragma: no cover
     _is_signals = False
 
+# Prefer a monotonic, high resolution clock to measure durations
+_timer = getattr(time, 'perf_counter', time.time)
+
+# CPU time of the process, Python 2 falling back on time.clock
+_cpu_timer = getattr(time, 'process_time', None) or time.clock
+
+#: Environment variable set by ``ParallelTestRunner`` to the id of the
+#: worker process running the tests.
+WORKER_ID_ENV = 'FLASK_TESTING_WORKER_ID'
+
 __all__ = ["TestCase"]
 
 
@@ -74,50 +128,963 @@ class JsonResponseMixin(object):
     Mixin with testing helper methods
     """
 
+    #: Module whose ``loads`` decodes JSON response bodies straight from
+    #: bytes, such as ``orjson`` or ``ujson``. Defaults to Flask's ``json``
+    #: module, which goes through the ``json_decoder`` of the app.
+    json_module = None
+
+    def _json_loads(self):
+        json_module = self.json_module
+        if json_module is None:
+            if not json_available:  # pragma: no cover
+                raise NotImplementedError
+            json_module = json
+        return json_module.loads
+
     @cached_property
     def json(self):
-        if not json_available:  # pragma: no cover
-            raise NotImplementedError
-        return json.loads(self.data)
+        loads = self._json_loads()
+
+        # Like Flask's own ``Response.json``, only decode JSON responses
+        if not getattr(self, 'is_json', True):
+            return None
+
+        return loads(self.data)
+
+    def iter_json_lines(self):
+        """
+        Decodes a newline-delimited JSON response one record at a time,
+        as the response is streamed, without loading the whole body.
+        """
+        loads = self._json_loads()
+        pending = b''
+
+        for chunk in self.iter_encoded():
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield loads(line)
+
+        if pending.strip():
+            yield loads(pending)
 
 
 def _make_test_response(response_class):
-    class TestResponse(response_class, JsonResponseMixin):
+    """
+    Returns the ``TestResponse`` subclass of ``response_class``, building
+    it only the first time it is needed.
+
+    The subclass is cached on ``response_class`` itself rather than in a
+    module level mapping: the subclass references its base anyway, so this
+    only forms a cycle and lets both be collected together once the
+    original response class goes away.
+    """
+    if issubclass(response_class, JsonResponseMixin):
+        return response_class
+
+    test_response = response_class.__dict__.get('_flask_testing_response')
+    if test_response is None:
+        # The mixin goes first so its ``json`` takes precedence over the
+        # one Flask 1.0+ responses have.
+        class TestResponse(JsonResponseMixin, response_class):
+            pass
+
+        test_response = TestResponse
+        try:
+            response_class._flask_testing_response = test_response
+        except TypeError:  # pragma: no cover
+            pass
+
+    return test_response
+
+
+def _empty_render(template, context, app):
+    """
+    Used to monkey patch the render_template flask method when
+    the render_templates property is set to False in the TestCase
+    """
+    if _is_signals:
+        template_rendered.send(app, template=template, context=context)
+
+    return ""
+
+
+def _function_of(method):
+    """
+    Returns the function behind ``method``, which is an unbound method
+    on Python 2 and a plain function on Python 3.
+    """
+    return getattr(method, '__func__', method)
+
+
+class _WeakContext(object):
+    """
+    A recorded template context holding weak references to the values
+    that support them, such as model instances, so recording the context
+    doesn't keep them alive.
+    """
+
+    def __init__(self, context):
+        self._values = {}
+        for key, value in context.items():
+            try:
+                value = weakref.ref(value)
+            except TypeError:
+                pass
+            self._values[key] = value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __getitem__(self, key):
+        value = self._values[key]
+        if isinstance(value, weakref.ref):
+            value = value()
+            if value is None:
+                raise ContextVariableDoesNotExist(
+                    "Context variable %r has been garbage collected" % key
+                )
+        return value
+
+
+def _check_template_context_capture(capture):
+    if capture is None or capture in ('full', 'weak') \
+            or isinstance(capture, (tuple, list, set, frozenset)):
+        return
+    raise ValueError(
+        "Unsupported template_context_capture %r, expected 'full', 'weak', "
+        "None or a collection of variable names" % (capture,)
+    )
+
+
+class _TemplateIndex(object):
+    """
+    Indexes the ``(template, context)`` pairs recorded by a test, templates
+    by name and contexts by variable name, the latest render winning.
+    """
+
+    def __init__(self, templates):
+        self.templates = templates
+        self.indexed = 0
+        self.last = None
+        self.by_name = {}
+        self.by_key = {}
+
+    def is_current(self, templates):
+        """
+        Tells whether ``templates`` is the list being indexed and only had
+        entries appended to it since the last update.
+        """
+        if templates is not self.templates or len(templates) < self.indexed:
+            return False
+        return self.indexed == 0 or templates[self.indexed - 1] is self.last
+
+    def update(self):
+        for entry in self.templates[self.indexed:]:
+            template, context = entry
+            self.by_name[getattr(template, 'name', None)] = template
+            if context is not None:
+                self.by_key.update(dict.fromkeys(context, context))
+            self.last = entry
+        self.indexed = len(self.templates)
+        return self
+
+
+_APP_SCOPES = ('class', 'module', 'session')
+
+# Applications built for ``create_app_scope``, keyed by ``_app_scope_key``.
+_scoped_apps = {}
+
+
+class _ScopedApp(object):
+    """
+    An application shared by several tests, along with a snapshot of its
+    state taken right after ``create_app`` so it can be restored after each
+    test.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.snapshot = AppSnapshot(app)
+        self._release_callbacks = []
+
+    def restore(self):
+        self.snapshot.restore()
+
+    def on_release(self, callback):
+        """
+        Calls ``callback`` once the app won't be used by tests anymore.
+        """
+        self._release_callbacks.append(callback)
+
+    def release(self):
+        while self._release_callbacks:
+            self._release_callbacks.pop()()
+
+
+def _app_scope_key(test, scope):
+    if scope not in _APP_SCOPES:
+        raise ValueError(
+            "Unsupported create_app_scope %r, expected one of: %s"
+            % (scope, ', '.join(_APP_SCOPES))
+        )
+
+    cls = type(test)
+    create_app = _function_of(cls.create_app)
+
+    if scope == 'class':
+        return (scope, cls)
+    elif scope == 'module':
+        return (scope, cls.__module__, create_app)
+    return (scope, create_app)
+
+
+def _release_scoped_apps(module=None, key=None):
+    """
+    Forgets the scoped apps that won't be used anymore once a test from
+    ``module`` with the scope ``key`` starts, since tests are run class by
+    class and module by module. Session scoped apps are kept until the test
+    run exits.
+    """
+    for stale_key in list(_scoped_apps):
+        scope = stale_key[0]
+        if stale_key == key or scope == 'session':
+            continue
+        if scope == 'module' and stale_key[1] == module:
+            continue
+        _scoped_apps.pop(stale_key).release()
+
+
+def _release_scoped_app(key):
+    scoped = _scoped_apps.pop(key, None)
+    if scoped is not None:
+        scoped.release()
+
+
+def _release_at_end_of_scope(test, key, release):
+    """
+    Calls ``release(key)`` once the class or module of ``test`` is done,
+    through the class and module cleanups of unittest 3.8+. Otherwise what
+    is shared with the scope ``key`` is only released once a test from
+    another class or module starts.
+    """
+    scope = key[0]
+    add_class_cleanup = getattr(type(test), 'addClassCleanup', None)
+    add_module_cleanup = getattr(unittest, 'addModuleCleanup', None)
+
+    if scope == 'class' and add_class_cleanup is not None:
+        add_class_cleanup(release, key)
+    elif scope == 'module' and add_module_cleanup is not None:
+        add_module_cleanup(release, key)
+
+
+def _get_scoped_app(test, key):
+    scoped = _scoped_apps.get(key)
+    if scoped is None:
+        scoped = _scoped_apps[key] = _ScopedApp(test.create_app())
+        _release_at_end_of_scope(test, key, _release_scoped_app)
+    return scoped
+
+
+def _get_worker_id():
+    worker_id = os.environ.get(WORKER_ID_ENV)
+    if worker_id is None:
+        return None
+    return int(worker_id)
+
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError):  # pragma: no cover
+    _PAGE_SIZE = 4096
+
+
+def _current_rss():
+    """
+    Returns the resident set size of the process in bytes, or its peak
+    where the current one isn't available, or ``None``.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (IOError, OSError, ValueError, IndexError):
         pass
 
-    return TestResponse
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class GCPolicy(object):
+    """
+    Garbage collection to run after each test, when set as the
+    ``run_gc_after_test`` attribute of a ``TestCase``.
+
+    Only the youngest generations are collected after each test, which is
+    much cheaper than the full collection ``run_gc_after_test = True``
+    runs. A full collection still runs every ``full_every`` tests and
+    whenever the process grew by more than ``rss_threshold`` bytes since
+    the last one.
+
+    With ``freeze`` enabled, all the objects existing when the first test
+    starts, such as the modules and app code imported by then, are moved
+    to a permanent generation the collector never scans again (Python
+    3.7+).
+
+    The number of objects collected after each test is kept in ``stats``
+    to help track down reference cycles leaking from tests.
+
+    The policy keeps track of the tests run, so share one instance between
+    test cases::
+
+        gc_policy = GCPolicy(generation=1, full_every=100)
+
+        class MyTest(TestCase):
+            run_gc_after_test = gc_policy
+
+    :param generation: the generation to collect after each test
+    :param full_every: run a full collection every this many tests
+    :param rss_threshold: run a full collection when the resident memory
+                          grew by more than this many bytes
+    :param freeze: freeze the objects existing before the first test
+    """
+
+    def __init__(self, generation=1, full_every=None, rss_threshold=None,
+                 freeze=False):
+        self.generation = generation
+        self.full_every = full_every
+        self.rss_threshold = rss_threshold
+        self.freeze = freeze
+        self.tests = 0
+        self.stats = []
+        self._frozen = False
+        self._baseline_rss = None
+
+    def current_rss(self):
+        return _current_rss()
+
+    def before_test(self, test):
+        if self.freeze and not self._frozen:
+            self._frozen = True
+            if hasattr(gc, 'freeze'):
+                gc.collect()
+                gc.freeze()
+
+        if self.rss_threshold is not None and self._baseline_rss is None:
+            self._baseline_rss = self.current_rss()
+
+    def after_test(self, test):
+        self.tests += 1
+
+        generation = self.generation
+        if self.full_every and self.tests % self.full_every == 0:
+            generation = 2
+
+        rss = None
+        if self.rss_threshold is not None:
+            rss = self.current_rss()
+            if rss is not None and self._baseline_rss is not None \
+                    and rss - self._baseline_rss > self.rss_threshold:
+                generation = 2
+
+        garbage = len(gc.garbage)
+        collected = gc.collect(generation)
+
+        if generation == 2 and self.rss_threshold is not None:
+            self._baseline_rss = self.current_rss()
+
+        self.stats.append({
+            'test': test.id(),
+            'generation': generation,
+            'collected': collected,
+            'uncollectable': len(gc.garbage) - garbage,
+        })
+
+    def most_collected(self, count=10):
+        """
+        Returns the stats of the ``count`` tests after which the most
+        objects were collected.
+        """
+        return sorted(self.stats, key=lambda stat: stat['collected'],
+                      reverse=True)[:count]
+
+
+# Environ templates of the test request contexts, keyed by the config
+# values they depend on.
+_environ_templates = {}
+
+
+def _environ_template(app):
+    """
+    Returns the cached environ of ``app.test_request_context()``, which
+    must be copied before use.
+    """
+    config = app.config
+    key = (config.get('SERVER_NAME'), config.get('APPLICATION_ROOT'),
+           config.get('PREFERRED_URL_SCHEME'))
+
+    template = _environ_templates.get(key)
+    if template is None:
+        environ = app.test_request_context().request.environ
+        template = dict((name, value) for name, value in environ.items()
+                        if name != 'werkzeug.request')
+        _environ_templates[key] = template
+    return template
+
+
+def _make_request_context(app):
+    """
+    Returns the same context as ``app.test_request_context()``, built from
+    a copy of a cached environ instead of going through ``EnvironBuilder``.
+    """
+    environ = dict(_environ_template(app))
+    environ['wsgi.input'] = BytesIO()
+    return app.request_context(environ)
+
+
+class BatchResponse(JsonResponseMixin):
+    """
+    Outcome of a request sent with ``TestCase.client_batch`` or the
+    ``LiveClient`` of a live server, lighter than a full response object.
+    The body is only joined and decoded when accessed, and it supports
+    ``assertStatus``, ``assertRedirects`` and the other status assertions.
+    """
+
+    def __init__(self, request, status, headers, body):
+        #: The request as passed to ``client_batch`` or the live client
+        self.request = request
+        self.status = status
+        self._headers = headers
+        self._body = body
+
+    def __repr__(self):
+        return '<%s %r [%s]>' % (type(self).__name__, self.request, self.status)
+
+    @cached_property
+    def status_code(self):
+        return int(self.status.split(None, 1)[0])
+
+    @cached_property
+    def headers(self):
+        return Headers(self._headers)
+
+    @property
+    def location(self):
+        return self.headers.get('Location')
+
+    @property
+    def mimetype(self):
+        return self.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+
+    @property
+    def is_json(self):
+        mimetype = self.mimetype
+        return mimetype == 'application/json' or (
+            mimetype.startswith('application/') and mimetype.endswith('+json')
+        )
+
+    @cached_property
+    def data(self):
+        return b''.join(self._body)
+
+    def get_data(self, as_text=False):
+        if as_text:
+            return self.data.decode('utf-8')
+        return self.data
+
+    def iter_encoded(self):
+        return iter(self._body)
+
+
+def _batch_environ(app, base, extra, request):
+    """
+    Builds the environ of a ``client_batch`` request, copying ``base``
+    unless ``request`` is a dict of arguments for the environ builder.
+    """
+    if isinstance(request, dict):
+        kwargs = dict(request)
+        kwargs['environ_base'] = dict(extra, **request.get('environ_base', {}))
+        builder = EnvironBuilder(app, **kwargs)
+        try:
+            return builder.get_environ()
+        finally:
+            builder.close()
+
+    if isinstance(request, tuple):
+        method, uri = request
+    else:
+        method, uri = 'GET', request
+
+    path, _, query_string = uri.partition('?')
+    path_info = unquote_to_bytes(path)
+    if not isinstance(path_info, str):
+        # WSGI strings are latin-1 decoded bytes on Python 3
+        path_info = path_info.decode('latin1')
+
+    environ = dict(base)
+    environ['REQUEST_METHOD'] = method.upper()
+    environ['PATH_INFO'] = path_info
+    environ['QUERY_STRING'] = query_string
+    environ['REQUEST_URI'] = environ['RAW_URI'] = uri
+    environ['wsgi.input'] = BytesIO()
+    return environ
+
+
+class _LazyRequestContext(object):
+    """
+    Stands in for the request context of a test on the context stack, only
+    building the actual context once something looks up a request bound
+    global such as ``request``, ``session`` or ``url_for``. The application
+    context is pushed right away.
+
+    The actual context is never pushed itself: the stand-in keeps its place
+    on the stack, as other contexts may be on top of it by then, like the
+    one of ``session_transaction``.
+    """
+
+    preserved = False
+
+    def __init__(self, app):
+        self.app = app
+        self.ctx = None
+        self._app_ctx = app.app_context()
+
+    def push(self):
+        self._app_ctx.push()
+        _request_ctx_stack.push(self)
+
+    def pop(self):
+        ctx = self.ctx
+        try:
+            if ctx is not None:
+                # What popping the actual context would have done
+                try:
+                    self.app.do_teardown_request()
+                finally:
+                    self.ctx = None
+                    ctx.request.close()
+                    ctx.request.environ['werkzeug.request'] = None
+        finally:
+            try:
+                _request_ctx_stack.pop()
+            finally:
+                self._app_ctx.pop()
+
+    def _build(self):
+        ctx = _make_request_context(self.app)
+
+        # What pushing the actual context would have done
+        session_interface = self.app.session_interface
+        ctx.session = session_interface.open_session(self.app, ctx.request)
+        if ctx.session is None:
+            ctx.session = session_interface.make_null_session(self.app)
+        if ctx.url_adapter is not None:
+            ctx.match_request()
+        return ctx
+
+    def __getattr__(self, name):
+        if self.ctx is None:
+            self.ctx = self._build()
+        return getattr(self.ctx, name)
+
+
+def _push_request_context(app, lazy):
+    if lazy and _request_ctx_stack is not None:
+        ctx = _LazyRequestContext(app)
+    else:
+        ctx = _make_request_context(app)
+    ctx.push()
+    return ctx
+
+
+class _SignalDispatcher(object):
+    """
+    Connected once to ``template_rendered`` and ``message_flashed``, and
+    forwards them to the test case running with the app that sent them,
+    so tests don't connect and disconnect receivers each time.
+    """
+
+    def __init__(self):
+        self._connected = False
+        # Apps to the stack of test cases running with them
+        self._tests = {}
+
+    def activate(self, test, app):
+        if not self._connected:
+            template_rendered.connect(self._template_rendered, weak=False)
+            request_finished.connect(self._request_finished, weak=False)
+            if _is_message_flashed:
+                message_flashed.connect(self._message_flashed, weak=False)
+            self._connected = True
+
+        tests = self._tests.get(app)
+        if tests is None:
+            tests = self._tests[app] = []
+        tests.append(test)
+
+    def deactivate(self, test, app):
+        tests = self._tests.get(app)
+        if not tests:
+            return
+
+        if tests[-1] is test:
+            tests.pop()
+        elif test in tests:
+            tests.remove(test)
+
+        if not tests:
+            del self._tests[app]
+
+    def _template_rendered(self, app, **kwargs):
+        tests = self._tests.get(app)
+        if tests:
+            tests[-1]._add_template(app, **kwargs)
+
+    def _request_finished(self, app, **kwargs):
+        tests = self._tests.get(app)
+        if tests:
+            tests[-1]._request_finished(app, **kwargs)
+
+    def _message_flashed(self, app, **kwargs):
+        tests = self._tests.get(app)
+        if tests:
+            tests[-1]._add_flash_message(app, **kwargs)
+
+
+_signal_dispatcher = _SignalDispatcher()
+
+
+_REDIRECT_STATUS_CODES = (301, 302, 303, 305, 307)
+_REDIRECT_STATUS_CODES_STR = ', '.join(str(code) for code in _REDIRECT_STATUS_CODES)
+
+
+def _describe_response(index, response):
+    """
+    Names a response in assertion messages after its request, falling back
+    on its position in the collection being checked.
+    """
+    request = getattr(response, 'request', None)
+    if request is None:
+        return '#%d' % index
+    if not hasattr(request, 'full_path'):
+        return '#%d %r' % (index, request)
+    return '#%d %s %s' % (index, request.method, request.full_path.rstrip('?'))
+
+
+def _format_mismatches(mismatches, total, description, limit=10):
+    """
+    Summarises the responses failing a collection assertion, listing up
+    to ``limit`` of them per group.
+    """
+    failed = sum(len(responses) for responses in mismatches.values())
+    lines = ['%d of %d responses %s:' % (failed, total, description)]
+    for key in sorted(mismatches, key=str):
+        responses = mismatches[key]
+        described = ', '.join(_describe_response(index, response)
+                              for index, response in responses[:limit])
+        if len(responses) > limit:
+            described += ', ... %d more' % (len(responses) - limit)
+        lines.append('  %s (%d): %s' % (key, len(responses), described))
+    return '\n'.join(lines)
+
+
+def _request_endpoint(environ, rule):
+    """
+    Names the endpoint a request went to after its method and the URL rule
+    it matched, or its path when it didn't match any.
+    """
+    return '%s %s' % (environ.get('REQUEST_METHOD'),
+                      rule or environ.get('PATH_INFO'))
+
+
+def _check_for_message_flashed_support():
+    if not _is_signals or not _is_message_flashed:
+        raise RuntimeError(
+            "Your version of Flask doesn't support message_flashed. "
+            "This requires Flask 0.10+ with the blinker module installed."
+        )
+
+
+def _check_for_signals_support():
+    if not _is_signals:
+        raise RuntimeError(
+            "Your version of Flask doesn't support signals. "
+            "This requires Flask 0.6+ with the blinker module installed."
+        )
+
+
+class _ResponseAssertions(object):
+    """
+    Assertions on the responses of the test client, ``client_batch`` and
+    the live client, shared by ``TestCase`` and ``LiveServerTestCase``.
+    """
+
+    def _expected_location(self, location):
+        parts = urlparse(location)
+
+        if parts.netloc:
+            return location
+
+        server_name = self.app.config.get('SERVER_NAME') or 'localhost'
+        return urljoin("http://%s" % server_name, location)
+
+    def assertRedirects(self, response, location, message=None):
+        """
+        Checks if response is an HTTP redirect to the
+        given location.
+
+        :param response: Flask response
+        :param location: relative URL path to SERVER_NAME or an absolute URL
+        """
+        expected_location = self._expected_location(location)
+
+        # Only format the failure messages when failing
+        if response.status_code not in _REDIRECT_STATUS_CODES:
+            not_redirect = "HTTP Status %s expected but got %d" % (
+                _REDIRECT_STATUS_CODES_STR, response.status_code)
+            self.fail(message or not_redirect)
+        if response.location != expected_location:
+            self.assertEqual(response.location, expected_location, message)
+
+    assert_redirects = assertRedirects
+
+    def assertAllRedirects(self, responses, location, message=None):
+        """
+        Checks that all the responses are HTTP redirects to the given
+        location, reporting every response that isn't at once, grouped
+        by status code and location.
+
+        :param responses: iterable of Flask responses
+        :param location: relative URL path to SERVER_NAME or an absolute URL
+        :param message: Message to display on test failure
+        """
+        expected_location = self._expected_location(location)
+
+        total = 0
+        mismatches = {}
+        for index, response in enumerate(responses):
+            total += 1
+            status_code = response.status_code
+            if status_code not in _REDIRECT_STATUS_CODES:
+                key = '%s' % status_code
+            elif response.location != expected_location:
+                key = '%s to %s' % (status_code, response.location)
+            else:
+                continue
+            mismatches.setdefault(key, []).append((index, response))
+
+        if mismatches:
+            self.fail(message or _format_mismatches(
+                mismatches, total,
+                "weren't redirects to %s" % expected_location
+            ))
+
+    assert_all_redirects = assertAllRedirects
+
+    def assertFasterThan(self, response, seconds, cpu=False, message=None):
+        """
+        Checks that the request of a response of ``self.client`` took less
+        than ``seconds``, in wall time or in CPU time.
+
+        :param response: Flask response
+        :param seconds: time limit, in seconds
+        :param cpu: check the CPU time instead of the wall time
+        :param message: Message to display on test failure
+        """
+        elapsed = getattr(response, 'cpu_time' if cpu else 'elapsed', None)
+        if elapsed is None:
+            raise RuntimeError(
+                "Only the responses of self.client and of the live client "
+                "are timed."
+            )
+
+        if elapsed >= seconds:
+            self.fail(message or "Request took %.2fms%s, expected less than %.2fms" % (
+                elapsed * 1e3, ' of CPU time' if cpu else '', seconds * 1e3))
+
+    assert_faster_than = assertFasterThan
+
+    def assertStatus(self, response, status_code, message=None):
+        """
+        Helper method to check matching response status.
+
+        :param response: Flask response
+        :param status_code: response status code (e.g. 200)
+        :param message: Message to display on test failure
+        """
+
+        # Only format the failure message when failing
+        if response.status_code != status_code:
+            message = message or 'HTTP Status %s expected but got %s' \
+                                 % (status_code, response.status_code)
+            self.assertEqual(response.status_code, status_code, message)
+
+    assert_status = assertStatus
+
+    def assertAllStatus(self, responses, status_code, message=None):
+        """
+        Checks that all the responses have the given status, reporting
+        every response that doesn't at once, grouped by status code.
+
+        :param responses: iterable of Flask responses
+        :param status_code: response status code (e.g. 200)
+        :param message: Message to display on test failure
+        """
+
+        total = 0
+        mismatches = {}
+        for index, response in enumerate(responses):
+            total += 1
+            if response.status_code != status_code:
+                mismatches.setdefault(response.status_code, []).append(
+                    (index, response)
+                )
+
+        if mismatches:
+            self.fail(message or _format_mismatches(
+                mismatches, total, "didn't have HTTP status %s" % status_code
+            ))
+
+    assert_all_status = assertAllStatus
+
+    def assert200(self, response, message=None):
+        """
+        Checks if response status code is 200
+
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 200, message)
+
+    assert_200 = assert200
+
+    def assert400(self, response, message=None):
+        """
+        Checks if response status code is 400
+
+        :versionadded: 0.2.5
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 400, message)
+
+    assert_400 = assert400
+
+    def assert401(self, response, message=None):
+        """
+        Checks if response status code is 401
+
+        :versionadded: 0.2.1
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 401, message)
+
+    assert_401 = assert401
+
+    def assert403(self, response, message=None):
+        """
+        Checks if response status code is 403
+
+        :versionadded: 0.2
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 403, message)
+
+    assert_403 = assert403
+
+    def assert404(self, response, message=None):
+        """
+        Checks if response status code is 404
+
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 404, message)
+
+    assert_404 = assert404
+
+    def assert405(self, response, message=None):
+        """
+        Checks if response status code is 405
+
+        :versionadded: 0.2
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 405, message)
+
+    assert_405 = assert405
+
+    def assert500(self, response, message=None):
+        """
+        Checks if response status code is 500
+
+        :versionadded: 0.4.1
+        :param response: Flask response
+        :param message: Message to display on test failure
+        """
+
+        self.assertStatus(response, 500, message)
+
+    assert_500 = assert500
+
 
+class TestCase(_ResponseAssertions, unittest.TestCase):
+    render_templates = True
+    run_gc_after_test = False
 
-def _empty_render(template, context, app):
-    """
-    Used to monkey patch the render_template flask method when
-    the render_templates property is set to False in the TestCase
-    """
-    if _is_signals:
-        template_rendered.send(app, template=template, context=context)
+    #: Set to ``'class'``, ``'module'`` or ``'session'`` to build the app
+    #: once per scope instead of calling ``create_app`` for every test.
+    create_app_scope = None
 
-    return ""
+    #: What to record of the context of each rendered template: ``'full'``
+    #: keeps the context itself, ``'weak'`` only keeps weak references to
+    #: its values where possible, a collection of variable names only keeps
+    #: those variables and ``None`` only keeps the template.
+    template_context_capture = 'full'
 
+    #: Record how long each setup and teardown phase of the tests takes in
+    #: ``flask_testing.timing.phase_timings``.
+    record_timings = False
 
-def _check_for_message_flashed_support():
-    if not _is_signals or not _is_message_flashed:
-        raise RuntimeError(
-            "Your version of Flask doesn't support message_flashed. "
-            "This requires Flask 0.10+ with the blinker module installed."
-        )
+    #: Only build the request context of the test once ``request``,
+    #: ``session`` or another request bound global is first used.
+    lazy_request_context = False
 
+    #: Fail the test as soon as a request of ``self.client`` takes longer
+    #: than this many seconds.
+    request_time_budget = None
 
-def _check_for_signals_support():
-    if not _is_signals:
-        raise RuntimeError(
-            "Your version of Flask doesn't support signals. "
-            "This requires Flask 0.6+ with the blinker module installed."
-        )
+    #: Measure the memory each test retains once torn down with
+    #: ``tracemalloc``, in ``flask_testing.memory.memory_profiles``. Set to
+    #: ``'requests'`` to also record the memory allocated by each request
+    #: of ``self.client``.
+    memory_profile = False
 
+    #: Fail tests retaining more than this many bytes, with
+    #: ``memory_profile`` enabled.
+    memory_threshold = None
 
-class TestCase(unittest.TestCase):
-    render_templates = True
-    run_gc_after_test = False
+    #: A ``TransactionIsolation`` running each test in a transaction rolled
+    #: back once it's done.
+    database_isolation = None
 
     def create_app(self):
         """
@@ -126,6 +1093,22 @@ class TestCase(unittest.TestCase):
         """
         raise NotImplementedError
 
+    @property
+    def worker_id(self):
+        """
+        The id of the ``ParallelTestRunner`` worker running this test,
+        starting at 0, or ``None`` when tests aren't run in parallel.
+        Use it for instance to give each worker its own database.
+        """
+        return _get_worker_id()
+
+    def count_queries(self):
+        """
+        Override to return how many database queries ran so far, so the
+        number of queries of each request of ``self.client`` is recorded.
+        """
+        return None
+
     def __call__(self, result=None):
         """
         Does the required setup, doing it here
@@ -146,15 +1129,43 @@ class TestCase(unittest.TestCase):
             self._post_teardown()
 
     def _pre_setup(self):
-        self.app = self.create_app()
+        self._torn_down = False
+        _check_template_context_capture(self.template_context_capture)
+        self._phase_timer = timer = start_phase_timer(self)
+
+        self._memory_profile = start_memory_profile(self)
+        if self._memory_profile is not None:
+            # Cleanups run last, and still count towards the test outcome
+            self.addCleanup(self._finish_memory_profile)
+
+        if isinstance(self.run_gc_after_test, GCPolicy):
+            self.run_gc_after_test.before_test(self)
+
+        scope_key = None
+        if self.create_app_scope is not None:
+            scope_key = _app_scope_key(self, self.create_app_scope)
+        _release_scoped_apps(type(self).__module__, scope_key)
+
+        if scope_key is None:
+            self.app = self.create_app()
+        else:
+            self._scoped_app = _get_scoped_app(self, scope_key)
+            self.app = self._scoped_app.app
+        timer.mark('create_app')
 
         self._orig_response_class = self.app.response_class
         self.app.response_class = _make_test_response(self.app.response_class)
 
         self.client = self.app.test_client()
+        self._time_requests(self.client)
+        timer.mark('client')
+
+        self._ctx = _push_request_context(self.app, self.lazy_request_context)
+        timer.mark('context')
 
-        self._ctx = self.app.test_request_context()
-        self._ctx.push()
+        if self.database_isolation is not None:
+            self.database_isolation.before_test(self)
+        timer.mark('database')
 
         if not self.render_templates:
             # Monkey patch the original template render with a empty render
@@ -165,20 +1176,181 @@ class TestCase(unittest.TestCase):
         self.flashed_messages = []
 
         if _is_signals:
-            template_rendered.connect(self._add_template)
+            _signal_dispatcher.activate(self, self.app)
+        timer.mark('signals')
 
-            if _is_message_flashed:
-                message_flashed.connect(self._add_flash_message)
+    def client_batch(self, requests, workers=None):
+        """
+        Sends many requests to the app and returns their outcomes as a list
+        of ``BatchResponse``, in the same order. Requests are paths, such as
+        ``'/users/?page=2'``, ``(method, path)`` pairs or dicts of arguments
+        for ``self.client.open``, like ``{'path': '/users/', 'json': {}}``.
+
+        Paths and pairs are built from a copy of one environ shared by the
+        whole batch, which makes them much cheaper than calling
+        ``self.client`` in a loop. The requests carry the cookies the client
+        had when the batch started, but cookies set by the responses aren't
+        stored and redirects aren't followed.
+
+        :param requests: iterable of requests
+        :param workers: number of threads sending the requests, or ``None``
+                        to send them one after the other
+        """
+        app = self.app
+        client = self.client
+
+        extra = dict(getattr(client, 'environ_base', None) or {})
+        extra['flask._preserve_context'] = False
+        cookie_jar = getattr(client, 'cookie_jar', None)
+        if cookie_jar is not None:
+            cookie_jar.inject_wsgi(extra)
+
+        base = dict(_environ_template(app))
+        base.update(extra)
+
+        def send(request):
+            environ = _batch_environ(app, base, extra, request)
+            body, status, headers = run_wsgi_app(app, environ, buffered=True)
+            return BatchResponse(request, status, headers, body)
+
+        if not workers:
+            return [send(request) for request in requests]
+
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(send, requests)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _time_requests(self, client):
+        """
+        Records the wall and CPU time and the number of queries of each
+        request sent by ``client``, on its response as ``elapsed``,
+        ``cpu_time`` and ``query_count`` and in ``request_timings``.
+        """
+        timings = []
+        depth = [0]
+        run_wsgi_app = client.run_wsgi_app
+        open_ = client.open
+
+        def timed_run_wsgi_app(environ, *args, **kwargs):
+            self._request_rule = None
+            memory_profile = getattr(self, '_memory_profile', None)
+            if memory_profile is not None:
+                memory_profile.request_started()
+            queries = self.count_queries()
+            start = _timer()
+            cpu_start = _cpu_timer()
+            try:
+                return run_wsgi_app(environ, *args, **kwargs)
+            finally:
+                elapsed = _timer() - start
+                cpu_time = _cpu_timer() - cpu_start
+                if queries is not None:
+                    queries = self.count_queries() - queries
+                endpoint = _request_endpoint(environ, self._request_rule)
+                timings.append((endpoint, elapsed, cpu_time, queries))
+                if memory_profile is not None:
+                    memory_profile.request_finished(endpoint)
+
+        def timed_open(*args, **kwargs):
+            # Redirects may go through open again
+            depth[0] += 1
+            try:
+                response = open_(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+                if not depth[0]:
+                    sent = timings[:]
+                    del timings[:]
+            if depth[0]:
+                return response
+
+            for timing in sent:
+                request_timings.record(*timing)
+
+            if sent:
+                endpoint, elapsed, cpu_time, queries = sent[-1]
+                target = response[1] if isinstance(response, tuple) else response
+                target.elapsed = elapsed
+                target.cpu_time = cpu_time
+                target.query_count = queries
+
+            budget = self.request_time_budget
+            if budget is not None:
+                for endpoint, elapsed, cpu_time, queries in sent:
+                    if elapsed > budget:
+                        self.fail(
+                            "%s took %.2fms, over the request_time_budget of "
+                            "%.2fms" % (endpoint, elapsed * 1e3, budget * 1e3)
+                        )
+            return response
+
+        client.run_wsgi_app = timed_run_wsgi_app
+        client.open = timed_open
+
+    def _request_finished(self, app, response):
+        rule = request.url_rule
+        self._request_rule = rule.rule if rule is not None else None
 
     def _add_flash_message(self, app, message, category):
         self.flashed_messages.append((message, category))
 
     def _add_template(self, app, template, context):
-        if len(self.templates) > 0:
-            self.templates = []
+        capture = self.template_context_capture
+        if capture is None:
+            context = None
+        elif capture == 'weak':
+            context = _WeakContext(context)
+        elif capture != 'full':
+            context = dict((key, context[key]) for key in capture if key in context)
         self.templates.append((template, context))
 
+    def _template_index(self):
+        index = getattr(self, '_templates_index', None)
+        # self.templates is public, start over if a test replaced or emptied it
+        if index is None or not index.is_current(self.templates):
+            index = self._templates_index = _TemplateIndex(self.templates)
+        return index.update()
+
+    def _finish_memory_profile(self):
+        profile = self._memory_profile
+        del self._memory_profile
+
+        # Measure what's left once the app, client and contexts are gone
+        self._post_teardown()
+        if not self.run_gc_after_test:
+            gc.collect()
+
+        retained, sites = profile.finish()
+        memory_profiles.record(self, retained, sites, profile.requests)
+
+        threshold = self.memory_threshold
+        if threshold is not None and retained > threshold:
+            self.fail(
+                "Test retained %d bytes, over the memory_threshold of %d "
+                "bytes. Largest allocation sites:\n%s" % (
+                    retained, threshold,
+                    '\n'.join('  %d bytes in %s' % (site['size'], site['site'])
+                              for site in sites)
+                )
+            )
+
     def _post_teardown(self):
+        if getattr(self, '_torn_down', False):
+            return
+
+        timer = getattr(self, '_phase_timer', _null_phase_timer)
+        timer.mark('test')
+
+        if _is_signals and getattr(self, 'app', None) is not None:
+            _signal_dispatcher.deactivate(self, self.app)
+
+        if self.database_isolation is not None and \
+                getattr(self, '_ctx', None) is not None:
+            self.database_isolation.after_test(self)
+
         if getattr(self, '_ctx', None) is not None:
             self._ctx.pop()
             del self._ctx
@@ -188,26 +1360,47 @@ class TestCase(unittest.TestCase):
                 self.app.response_class = self._orig_response_class
             del self.app
 
+        if getattr(self, '_scoped_app', None) is not None:
+            self._scoped_app.restore()
+            del self._scoped_app
+
         if hasattr(self, 'client'):
             del self.client
 
         if hasattr(self, 'templates'):
             del self.templates
 
+        if hasattr(self, '_templates_index'):
+            del self._templates_index
+
         if hasattr(self, 'flashed_messages'):
             del self.flashed_messages
 
-        if _is_signals:
-            template_rendered.disconnect(self._add_template)
-
-            if _is_message_flashed:
-                message_flashed.disconnect(self._add_flash_message)
+        if hasattr(self, '_request_rule'):
+            del self._request_rule
 
         if hasattr(self, '_original_template_render'):
             templating._render = self._original_template_render
+        timer.mark('teardown')
 
-        if self.run_gc_after_test:
+        if isinstance(self.run_gc_after_test, GCPolicy):
+            self.run_gc_after_test.after_test(self)
+            timer.mark('gc')
+        elif self.run_gc_after_test:
             gc.collect()
+            timer.mark('gc')
+
+        if timer.phases is not None:
+            phase_timings.record(self, timer.phases)
+            del self._phase_timer
+
+        if getattr(self, '_memory_profile', None) is not None:
+            # The setup failed, so the cleanup finishing the profile never
+            # runs
+            self._memory_profile.stop()
+            del self._memory_profile
+
+        self._torn_down = True
 
     def assertMessageFlashed(self, message, category='message'):
         """
@@ -230,7 +1423,7 @@ class TestCase(unittest.TestCase):
 
     def assertTemplateUsed(self, name, tmpl_name_attribute='name'):
         """
-        Checks if a given template is used in the request.
+        Checks if a given template was rendered during the test.
         Only works if your version of Flask has signals
         support (0.6+) and blinker is installed.
         If the template engine used is not Jinja2, provide
@@ -243,22 +1436,25 @@ class TestCase(unittest.TestCase):
         """
         _check_for_signals_support()
 
-        used_templates = []
-
-        for template, context in self.templates:
-            if getattr(template, tmpl_name_attribute) == name:
+        if tmpl_name_attribute == 'name':
+            if name in self._template_index().by_name:
                 return True
+        else:
+            for template, context in self.templates:
+                if getattr(template, tmpl_name_attribute) == name:
+                    return True
 
-            used_templates.append(template)
-
-        raise AssertionError("Template %s not used. Templates were used: %s" % (name, ' '.join(repr(used_templates))))
+        used_templates = [template for template, context in self.templates]
+        raise AssertionError("Template %s not used. Templates were used: %s" % (
+            name, ' '.join(repr(template) for template in used_templates)))
 
     assert_template_used = assertTemplateUsed
 
     def get_context_variable(self, name):
         """
         Returns a variable from the context passed to the
-        template. Only works if your version of Flask
+        templates rendered during the test, the latest render
+        winning. Only works if your version of Flask
         has signals support (0.6+) and blinker is installed.
 
         Raises a ContextVariableDoesNotExist exception if does
@@ -269,10 +1465,22 @@ class TestCase(unittest.TestCase):
         """
         _check_for_signals_support()
 
-        for template, context in self.templates:
-            if name in context:
-                return context[name]
-        raise ContextVariableDoesNotExist
+        capture = self.template_context_capture
+        if capture is None:
+            raise RuntimeError(
+                "Template contexts aren't recorded when "
+                "template_context_capture is None."
+            )
+        if capture not in ('full', 'weak') and name not in capture:
+            raise RuntimeError(
+                "Context variable %r isn't recorded, add it to "
+                "template_context_capture." % name
+            )
+
+        try:
+            return self._template_index().by_key[name][name]
+        except KeyError:
+            raise ContextVariableDoesNotExist
 
     def assertContext(self, name, value, message=None):
         """
@@ -291,139 +1499,390 @@ class TestCase(unittest.TestCase):
 
     assert_context = assertContext
 
-    def assertRedirects(self, response, location, message=None):
-        """
-        Checks if response is an HTTP redirect to the
-        given location.
 
-        :param response: Flask response
-        :param location: relative URL path to SERVER_NAME or an absolute URL
-        """
-        parts = urlparse(location)
+# A LiveServerTestCase useful with Selenium or headless browsers
+# Inspired by https://docs.djangoproject.com/en/dev/topics/testing/#django.test.LiveServerTestCase
 
-        if parts.netloc:
-            expected_location = location
+class _KeepAliveRequestHandler(WSGIRequestHandler):
+    """
+    Speaks HTTP/1.1, like the threaded servers of Werkzeug 2.1+, so that
+    clients can reuse their connections. The part of the request body the
+    application didn't read is skipped before the next request.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        WSGIRequestHandler.setup(self)
+        # The headers and the body are sent separately, don't let the
+        # body wait for the client to acknowledge the headers.
+        if self.connection.family != getattr(socket, 'AF_UNIX', None):
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def make_environ(self):
+        environ = WSGIRequestHandler.make_environ(self)
+        if environ.get('wsgi.input_terminated'):
+            # Chunked request bodies can't be skipped reliably
+            self.close_connection = True
         else:
-            server_name = self.app.config.get('SERVER_NAME') or 'localhost'
-            expected_location = urljoin("http://%s" % server_name, location)
+            self._input = LimitedStream(
+                environ['wsgi.input'], int(environ.get('CONTENT_LENGTH') or 0)
+            )
+            environ['wsgi.input'] = self._input
+        return environ
 
-        valid_status_codes = (301, 302, 303, 305, 307)
-        valid_status_code_str = ', '.join(str(code) for code in valid_status_codes)
-        not_redirect = "HTTP Status %s expected but got %d" % (valid_status_code_str, response.status_code)
-        self.assertTrue(response.status_code in valid_status_codes, message or not_redirect)
-        self.assertEqual(response.location, expected_location, message)
+    def run_wsgi(self):
+        self._input = None
+        WSGIRequestHandler.run_wsgi(self)
+        if self._input is not None:
+            while self._input.read(65536):
+                pass
 
-    assert_redirects = assertRedirects
 
-    def assertStatus(self, response, status_code, message=None):
-        """
-        Helper method to check matching response status.
+def _discard_request_log(handler, code='-', size='-'):
+    pass
 
-        :param response: Flask response
-        :param status_code: response status code (e.g. 200)
-        :param message: Message to display on test failure
-        """
 
-        message = message or 'HTTP Status %s expected but got %s' \
-                             % (status_code, response.status_code)
-        self.assertEqual(response.status_code, status_code, message)
+def _buffer_request_log(handler, code='-', size='-'):
+    handler.server.request_log.append('%s - - [%s] "%s" %s %s' % (
+        handler.address_string(), handler.log_date_time_string(),
+        handler.requestline, code, size))
 
-    assert_status = assertStatus
 
-    def assert200(self, response, message=None):
-        """
-        Checks if response status code is 200
+def make_live_server(app, host='127.0.0.1', port=0, threaded=True,
+                     processes=1, backlog=None, request_log=True, fd=None):
+    """
+    Creates the Werkzeug server of a live server, bound and listening.
+    Threaded and multi process servers speak HTTP/1.1, so clients can keep
+    their connections alive. As with ``app.run``, the server shows the
+    interactive debugger when ``app.debug`` is set.
+
+    :param app: the application to serve
+    :param host: address to listen on
+    :param port: port to listen on, ``0`` to let the OS pick one
+    :param threaded: handle each request in a new thread
+    :param processes: handle each request in a new process, up to this many
+                      at a time
+    :param backlog: size of the queue of the connections waiting to be
+                    accepted, 128 by default
+    :param request_log: ``True`` to log each request, ``False`` not to, or
+                        ``'buffered'`` to keep them in ``server.request_log``
+                        and write them to stderr once the server is closed
+    :param fd: file descriptor of a listening socket to serve on instead of
+               binding a new one, in which case ``backlog`` is ignored
+    """
+    if threaded and processes > 1:
+        raise ValueError(
+            "A live server can't have several threads and processes."
+        )
+    if request_log not in (True, False, 'buffered'):
+        raise ValueError(
+            "Unsupported request_log %r, expected True, False or "
+            "'buffered'" % (request_log,)
+        )
+    if request_log == 'buffered' and processes > 1:
+        raise ValueError(
+            "The requests of a multi process server can't be buffered."
+        )
 
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+    handler = _KeepAliveRequestHandler if threaded or processes > 1 \
+        else WSGIRequestHandler
+    if request_log is not True:
+        handler = type(handler.__name__, (handler,), {
+            'log_request': _buffer_request_log if request_log
+            else _discard_request_log
+        })
+
+    if threaded:
+        server_class = ThreadedWSGIServer
+    elif processes > 1:
+        server_class = ForkingWSGIServer
+    else:
+        server_class = BaseWSGIServer
+    if backlog is not None:
+        server_class = type(server_class.__name__, (server_class,), {
+            'request_queue_size': backlog
+        })
+
+    if app.debug:
+        from werkzeug.debug import DebuggedApplication
+        app = DebuggedApplication(app, True)
+
+    if processes > 1:
+        server = server_class(host, port, app, processes, handler, fd=fd)
+    else:
+        server = server_class(host, port, app, handler, fd=fd)
+    server.request_log = [] if request_log == 'buffered' else None
+    return server
+
+
+# Same default as Werkzeug's servers
+_DEFAULT_BACKLOG = 128
+
+
+def _bind_live_server_socket(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog or _DEFAULT_BACKLOG)
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+def _close_live_server(server):
+    server.server_close()
+
+    request_log = getattr(server, 'request_log', None)
+    if request_log:
+        sys.stderr.write('\n'.join(request_log) + '\n')
+        del request_log[:]
+
+
+def _unix_socket_path(option):
+    """
+    Returns the path of the Unix socket to serve on for the
+    ``LIVESERVER_UNIX_SOCKET`` ``option``, and the temporary directory
+    created for it, if any.
+    """
+    if not option:
+        return None, None
+    if option is True:
+        directory = tempfile.mkdtemp(prefix='flask-testing-')
+        return os.path.join(directory, 'server.sock'), directory
+    return option, None
 
-        self.assertStatus(response, 200, message)
 
-    assert_200 = assert200
+def _remove_unix_socket(path, directory):
+    if directory is not None:
+        shutil.rmtree(directory, ignore_errors=True)
+    elif path is not None and os.path.exists(path):
+        os.unlink(path)
 
-    def assert400(self, response, message=None):
-        """
-        Checks if response status code is 400
 
-        :versionadded: 0.2.5
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+def _server_port(server):
+    """
+    Returns the port a server listens on, or 0 for a Unix socket.
+    """
+    address = server.server_address
+    return address[1] if isinstance(address, tuple) else 0
 
-        self.assertStatus(response, 400, message)
 
-    assert_400 = assert400
+# Host of the requests sent over Unix sockets
+_UNIX_SOCKET_HOST = 'localhost'
 
-    def assert401(self, response, message=None):
-        """
-        Checks if response status code is 401
 
-        :versionadded: 0.2.1
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+class UnixHTTPConnection(HTTPConnection):
+    """
+    An ``HTTPConnection`` to a server listening on the Unix socket at
+    ``unix_path``.
+    """
 
-        self.assertStatus(response, 401, message)
+    def __init__(self, unix_path, timeout=None):
+        HTTPConnection.__init__(self, _UNIX_SOCKET_HOST, timeout=timeout)
+        self.unix_path = unix_path
 
-    assert_401 = assert401
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.unix_path)
+        except Exception:
+            sock.close()
+            raise
+        self.sock = sock
 
-    def assert403(self, response, message=None):
-        """
-        Checks if response status code is 403
 
-        :versionadded: 0.2
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+def _server_connection(url, timeout=None):
+    """
+    Returns an HTTP connection to the server at ``url``, which can use the
+    ``http``, ``https`` or ``http+unix`` scheme.
+    """
+    parts = urlparse(url)
+    if parts.scheme == 'http+unix':
+        return UnixHTTPConnection(unquote(parts.netloc), timeout=timeout)
+    if parts.scheme == 'http':
+        return HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    if parts.scheme == 'https':
+        return HTTPSConnection(parts.hostname, parts.port or 443,
+                               timeout=timeout)
+    raise ValueError("Unsupported server url scheme: %s" % parts.scheme)
+
+
+class _ServerThread(threading.Thread):
+    """
+    Runs the live server in a background thread of the test process,
+    quacking like the ``multiprocessing.Process`` of the default backend.
+    """
 
-        self.assertStatus(response, 403, message)
+    #: How often, in seconds, the server checks whether it should stop,
+    #: which bounds how long ``terminate`` blocks.
+    poll_interval = 0.01
 
-    assert_403 = assert403
+    def __init__(self, server):
+        super(_ServerThread, self).__init__()
+        self.daemon = True
+        self.server = server
 
-    def assert404(self, response, message=None):
-        """
-        Checks if response status code is 404
+    def run(self):
+        try:
+            if isinstance(self.server, socketserver.BaseServer):
+                # Werkzeug < 2.0 doesn't pass a poll interval through, so
+                # run the standard library loop it wraps directly.
+                socketserver.BaseServer.serve_forever(
+                    self.server, self.poll_interval
+                )
+            else:
+                self.server.serve_forever()
+        finally:
+            _close_live_server(self.server)
 
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+    def terminate(self):
+        # ``shutdown`` waits for the request being handled to finish, ask
+        # from another thread so that joining bounds the wait instead.
+        stopper = threading.Thread(target=self.server.shutdown)
+        stopper.daemon = True
+        stopper.start()
 
-        self.assertStatus(response, 404, message)
 
-    assert_404 = assert404
+def _shutdown_live_server(handle, timeout):
+    """
+    Asks the live server process or thread ``handle`` to stop and waits
+    up to ``timeout`` seconds for it, then kills the process if it is still
+    running. Joining also reaps the process so it doesn't linger as a
+    zombie. A thread can't be killed, so one still running is left behind
+    with a warning. Returns how long, in seconds, the shutdown took.
+    """
+    start_time = _timer()
+
+    handle.terminate()
+    handle.join(timeout)
+
+    if handle.is_alive():
+        if isinstance(handle, multiprocessing.Process):
+            if hasattr(handle, 'kill'):
+                handle.kill()
+            else:  # pragma: no cover
+                # Python < 3.7
+                os.kill(handle.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            handle.join()
+        else:
+            warnings.warn(
+                "The live server thread %s didn't stop within %s seconds, "
+                "it is left running until its request is handled."
+                % (handle.name, timeout), RuntimeWarning
+            )
 
-    def assert405(self, response, message=None):
-        """
-        Checks if response status code is 405
+    return _timer() - start_time
 
-        :versionadded: 0.2
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
 
-        self.assertStatus(response, 405, message)
+class _LiveServer(object):
+    """
+    A live server shared by several tests, along with the application
+    it serves.
+    """
 
-    assert_405 = assert405
+    def __init__(self, app, configured_port, port_value, process,
+                 server_thread, startup_time, unix_socket=None,
+                 unix_socket_dir=None):
+        self.app = app
+        self.shutdown_timeout = app.config.get('LIVESERVER_SHUTDOWN_TIMEOUT', 5)
+        self.configured_port = configured_port
+        self.port_value = port_value
+        self.process = process
+        self.server_thread = server_thread
+        self.startup_time = startup_time
+        self.unix_socket = unix_socket
+        self.unix_socket_dir = unix_socket_dir
+
+    @property
+    def handle(self):
+        return self.process or self.server_thread
+
+    def is_alive(self):
+        return self.handle is not None and self.handle.is_alive()
+
+    def terminate(self):
+        if self.handle:
+            _shutdown_live_server(self.handle, self.shutdown_timeout)
+        _remove_unix_socket(self.unix_socket, self.unix_socket_dir)
+
+
+def _live_server_host(config):
+    """
+    Returns the address the live server listens on: ``LIVESERVER_HOST``,
+    or like ``app.run`` the host of ``SERVER_NAME``, ``127.0.0.1`` if
+    neither is set.
+    """
+    host = config.get('LIVESERVER_HOST')
+    if host is None:
+        host = (config.get('SERVER_NAME') or '').partition(':')[0] \
+            or '127.0.0.1'
+    return host
 
-    def assert500(self, response, message=None):
-        """
-        Checks if response status code is 500
 
-        :versionadded: 0.4.1
-        :param response: Flask response
-        :param message: Message to display on test failure
-        """
+# Hosts the live server is reached at as ``localhost``
+_LOCAL_HOSTS = ('127.0.0.1', 'localhost', '0.0.0.0', '::', '')
 
-        self.assertStatus(response, 500, message)
+# Live servers started for ``live_server_scope``, keyed by ``_app_scope_key``.
+_live_servers = {}
 
-    assert_500 = assert500
+
+def _release_live_servers(module=None, key=None):
+    """
+    Terminates the shared live servers that won't be used anymore once a
+    test from ``module`` with the scope ``key`` starts, so they don't hold
+    on to their port. Session scoped servers are kept until the test run
+    exits.
+    """
+    for stale_key in list(_live_servers):
+        scope = stale_key[0]
+        if stale_key == key or scope == 'session':
+            continue
+        if scope == 'module' and stale_key[1] == module:
+            continue
+        _live_servers.pop(stale_key).terminate()
 
 
-# A LiveServerTestCase useful with Selenium or headless browsers
-# Inspired by https://docs.djangoproject.com/en/dev/topics/testing/#django.test.LiveServerTestCase
+def _release_live_server(key):
+    live_server = _live_servers.pop(key, None)
+    if live_server is not None:
+        live_server.terminate()
+
+
+class LiveServerTestCase(_ResponseAssertions, unittest.TestCase):
+
+    #: Set to ``'class'``, ``'module'`` or ``'session'`` to start the app
+    #: and its live server once per scope instead of once per test.
+    live_server_scope = None
+
+    #: How long, in seconds, it took to start the live server used by the
+    #: current test.
+    live_server_startup_time = None
+
+    #: How long, in seconds, it took to shut the live server down after the
+    #: current test. Stays ``None`` for servers shared with other tests.
+    live_server_shutdown_time = None
+
+    #: Only build the request context of the test once ``request``,
+    #: ``session`` or another request bound global is first used.
+    lazy_request_context = False
+
+    #: Maximum number of connections the ``live_client`` keeps open and
+    #: sends requests over at the same time
+    live_client_connections = 10
+
+    #: Timeout, in seconds, of each request of the ``live_client``
+    live_client_timeout = 5
+
+    # Path of the Unix socket the live server listens on, if any, and the
+    # temporary directory created for it
+    _unix_socket = None
+    _unix_socket_dir = None
 
-class LiveServerTestCase(unittest.TestCase):
     def create_app(self):
         """
         Create your Flask app here, with any
@@ -431,90 +1890,328 @@ class LiveServerTestCase(unittest.TestCase):
         """
         raise NotImplementedError
 
+    @property
+    def worker_id(self):
+        """
+        The id of the ``ParallelTestRunner`` worker running this test,
+        starting at 0, or ``None`` when tests aren't run in parallel.
+        """
+        return _get_worker_id()
+
+    def live_client(self, connections=None, timeout=None, headers=None):
+        """
+        Returns an asyncio ``LiveClient`` of the live server, to send
+        requests from coroutines. Requires Python 3.5+.
+
+        :param connections: ``live_client_connections`` by default
+        :param timeout: ``live_client_timeout`` by default
+        :param headers: dict of headers to send with every request
+        """
+        from .aio import LiveClient
+
+        return LiveClient(
+            self.get_server_url(),
+            connections or self.live_client_connections,
+            self.live_client_timeout if timeout is None else timeout,
+            headers
+        )
+
+    def live_requests(self, requests, connections=None, timeout=None,
+                      headers=None):
+        """
+        Sends all the ``requests`` to the live server concurrently, over
+        up to ``connections`` kept alive connections, and returns their
+        responses in the same order. Requires Python 3.5+.
+
+        :param requests: iterable of paths, ``(method, path)`` tuples or
+                         dicts with the ``method``, ``path``, ``headers``,
+                         ``data`` and ``timeout`` of the request
+        :param connections: ``live_client_connections`` by default
+        :param timeout: ``live_client_timeout`` by default
+        :param headers: dict of headers to send with every request
+        """
+        from .aio import _run_requests
+
+        return _run_requests(
+            self.get_server_url(), requests,
+            connections or self.live_client_connections,
+            self.live_client_timeout if timeout is None else timeout,
+            headers
+        )
+
+    def live_connection(self, timeout=None):
+        """
+        Returns an ``HTTPConnection`` of the standard library to the live
+        server, going through its Unix socket when it listens on one.
+
+        :param timeout: timeout of the connection, in seconds
+        """
+        return _server_connection(self.get_server_url(), timeout)
+
+    def reset_live_server(self):
+        """
+        Called before each test that reuses a live server started by an
+        earlier test when ``live_server_scope`` is set. Override it to
+        reset any per-test state kept by the server.
+        """
+
     def __call__(self, result=None):
         """
         Does the required setup, doing it here means you don't have to
         call super.setUp in subclasses.
         """
-
-        # Get the app
-        self.app = self.create_app()
-
-        self._configured_port = self.app.config.get('LIVESERVER_PORT', 5000)
-        self._port_value = multiprocessing.Value('i', self._configured_port)
+        scope_key = None
+        if self.live_server_scope is not None:
+            scope_key = _app_scope_key(self, self.live_server_scope)
+        _release_live_servers(type(self).__module__, scope_key)
+
+        live_server = _live_servers.get(scope_key)
+        if live_server is not None and not live_server.is_alive():
+            del _live_servers[scope_key]
+            live_server = None
+
+        if live_server is None:
+            # Get the app
+            self.app = self.create_app()
+
+            if self.worker_id is None:
+                self._configured_port = self.app.config.get('LIVESERVER_PORT', 5000)
+            else:
+                # Workers run at the same time, let the OS pick a free port
+                self._configured_port = 0
+            self._port_value = multiprocessing.Value('i', self._configured_port)
+            self._unix_socket, self._unix_socket_dir = _unix_socket_path(
+                self.app.config.get('LIVESERVER_UNIX_SOCKET')
+            )
+        else:
+            self.app = live_server.app
+            self._configured_port = live_server.configured_port
+            self._port_value = live_server.port_value
+            self._unix_socket = live_server.unix_socket
+            self._unix_socket_dir = live_server.unix_socket_dir
+            self._process = live_server.process
+            self._server_thread = live_server.server_thread
+            self.live_server_startup_time = live_server.startup_time
 
         # We need to create a context in order for extensions to catch up
-        self._ctx = self.app.test_request_context()
-        self._ctx.push()
+        self._ctx = _push_request_context(self.app, self.lazy_request_context)
 
         try:
-            self._spawn_live_server()
+            if live_server is None:
+                self._spawn_live_server()
+                if scope_key is not None:
+                    _live_servers[scope_key] = _LiveServer(
+                        self.app, self._configured_port, self._port_value,
+                        self._process, self._server_thread,
+                        self.live_server_startup_time, self._unix_socket,
+                        self._unix_socket_dir
+                    )
+                    _release_at_end_of_scope(self, scope_key,
+                                             _release_live_server)
+            else:
+                self.reset_live_server()
             super(LiveServerTestCase, self).__call__(result)
         finally:
             self._post_teardown()
-            self._terminate_live_server()
+            # Shared servers are terminated with their scope, but not the
+            # ones which failed to start
+            if scope_key not in _live_servers:
+                self._terminate_live_server()
 
     def get_server_url(self):
         """
         Return the url of the test server
         """
-        return 'http://localhost:%s' % self._port_value.value
+        if self._unix_socket is not None:
+            return 'http+unix://%s' % quote(self._unix_socket, safe='')
+
+        host = _live_server_host(self.app.config)
+        if host in _LOCAL_HOSTS:
+            host = 'localhost'
+        elif ':' in host:
+            host = '[%s]' % host
+        return 'http://%s:%s' % (host, self._port_value.value)
+
+    def _expected_location(self, location):
+        # Relative locations are relative to the live server, which builds
+        # them from the Host the clients of Unix sockets send
+        url = self.get_server_url()
+        if url.startswith('http+unix://'):
+            url = 'http://%s' % _UNIX_SOCKET_HOST
+        return urljoin(url, location)
 
     def _spawn_live_server(self):
         self._process = None
-        port_value = self._port_value
-
-        def worker(app, port):
-            # Based on solution: http://stackoverflow.com/a/27598916
-            # Monkey-patch the server_bind so we can determine the port bound by Flask.
-            # This handles the case where the port specified is `0`, which means that
-            # the OS chooses the port. This is the only known way (currently) of getting
-            # the port out of Flask once we call `run`.
-            original_socket_bind = socketserver.TCPServer.server_bind
-            def socket_bind_wrapper(self):
-                ret = original_socket_bind(self)
-
-                # Get the port and save it into the port_value, so the parent process
-                # can read it.
-                (_, port) = self.socket.getsockname()
-                port_value.value = port
-                socketserver.TCPServer.server_bind = original_socket_bind
-                return ret
-
-            socketserver.TCPServer.server_bind = socket_bind_wrapper
-            app.run(port=port, use_reloader=False)
-
-        self._process = multiprocessing.Process(
-            target=worker, args=(self.app, self._configured_port)
-        )
-
-        self._process.start()
+        self._server_thread = None
 
         # We must wait for the server to start listening, but give up
         # after a specified maximum timeout
         timeout = self.app.config.get('LIVESERVER_TIMEOUT', 5)
-        start_time = time.time()
+        start_time = _timer()
+        deadline = start_time + timeout
 
-        while True:
-            elapsed_time = (time.time() - start_time)
-            if elapsed_time > timeout:
+        def check_timeout():
+            if _timer() > deadline:
                 raise RuntimeError(
                     "Failed to start the server after %d seconds. " % timeout
                 )
 
-            if self._can_ping_server():
-                break
+        backend = self.app.config.get('LIVESERVER_BACKEND', 'process')
+        if backend == 'process':
+            self._spawn_server_process(check_timeout)
+        elif backend == 'thread':
+            self._spawn_server_thread()
+        else:
+            raise ValueError(
+                "Unsupported LIVESERVER_BACKEND %r, expected 'process' "
+                "or 'thread'" % backend
+            )
+
+        # The server is listening, but a custom get_server_url() may point
+        # somewhere else (e.g. a proxy), so fall back to pinging it.
+        if _function_of(type(self).get_server_url) \
+                is not _function_of(LiveServerTestCase.get_server_url):
+            interval = self.app.config.get('LIVESERVER_PING_INTERVAL', 0.01)
+            while not self._can_ping_server():
+                check_timeout()
+                time.sleep(interval)
+                interval = min(interval * 2, 0.5)
+
+        self.live_server_startup_time = _timer() - start_time
+
+    def _bind_live_server(self):
+        """
+        Binds the socket of the default server in the test process, so its
+        port is known and it accepts connections before the server even
+        starts. Returns ``None`` with a ``LIVESERVER_SERVER_FACTORY``, which
+        binds its own socket, or a Unix socket, which Werkzeug binds itself
+        and which can't race for a port anyway.
+        """
+        config = self.app.config
+        if config.get('LIVESERVER_SERVER_FACTORY') is not None \
+                or self._unix_socket is not None:
+            return None
+
+        host = _live_server_host(config)
+        try:
+            sock = _bind_live_server_socket(
+                host, self._configured_port, config.get('LIVESERVER_BACKLOG')
+            )
+        except socket.error as e:
+            raise RuntimeError(
+                "Failed to start the server on %s:%s: %s"
+                % (host, self._configured_port, e)
+            )
+
+        self._port_value.value = sock.getsockname()[1]
+        return sock
+
+    def _make_live_server(self, app, port, fd=None):
+        config = app.config
+        if self._unix_socket is not None:
+            host = 'unix://%s' % self._unix_socket
+        else:
+            host = _live_server_host(config)
+
+        factory = config.get('LIVESERVER_SERVER_FACTORY')
+        if factory is not None:
+            return factory(app, host, port)
+
+        processes = config.get('LIVESERVER_PROCESSES', 1)
+        return make_live_server(
+            app, host, port,
+            threaded=config.get('LIVESERVER_THREADED', processes == 1),
+            processes=processes,
+            backlog=config.get('LIVESERVER_BACKLOG'),
+            request_log=config.get('LIVESERVER_REQUEST_LOG', True),
+            fd=fd,
+        )
+
+    def _spawn_server_process(self, check_timeout):
+        sock = self._bind_live_server()
+        fd = None if sock is None else sock.fileno()
+        port_value = self._port_value
+        ready = multiprocessing.Event()
+
+        def worker(app, port, fd):
+            # Leave through the regular exit path on terminate() so the server
+            # gets to close its socket.
+            def stop(signum, frame):
+                raise SystemExit(0)
+
+            signal.signal(signal.SIGTERM, stop)
+
+            server = self._make_live_server(app, port, fd)
+            if fd is None:
+                # Tell the parent process the port the server listens on,
+                # which the OS picks when the configured port is 0.
+                port_value.value = _server_port(server)
+                ready.set()
+            try:
+                server.serve_forever()
+            finally:
+                _close_live_server(server)
+
+        self._process = multiprocessing.Process(
+            target=worker, args=(self.app, self._configured_port, fd)
+        )
+        # Make sure a server left running, such as a session scoped one,
+        # never keeps the test run from exiting.
+        self._process.daemon = True
+        try:
+            self._process.start()
+        finally:
+            if sock is not None:
+                # The server process has its own copy of the socket
+                sock.close()
+
+        if sock is not None:
+            # Connections wait in the backlog of the socket until the
+            # server accepts them, so there is nothing to wait for.
+            return
+
+        while not ready.wait(0.1):
+            check_timeout()
+            if not self._process.is_alive():
+                raise RuntimeError(
+                    "The server process exited with code %s before it "
+                    "started listening." % self._process.exitcode
+                )
+
+    def _spawn_server_thread(self):
+        # The server is bound and listening as soon as it is created, so
+        # there is nothing to wait for.
+        sock = self._bind_live_server()
+        try:
+            server = self._make_live_server(
+                self.app, self._configured_port,
+                None if sock is None else sock.fileno()
+            )
+        finally:
+            if sock is not None:
+                # The server serves on a copy of the socket
+                sock.close()
+        self._port_value.value = _server_port(server)
+
+        self._server_thread = _ServerThread(server)
+        self._server_thread.start()
 
     def _can_ping_server(self):
-        host, port = self._get_server_address()
-        if port == 0:
+        address = self._get_server_address()
+        if not isinstance(address, tuple):
+            family = socket.AF_UNIX
+        elif address[1] == 0:
             # Port specified by the user was 0, and the OS has not yet assigned
             # the proper port.
             return False
+        elif ':' in address[0]:
+            family = socket.AF_INET6
+        else:
+            family = socket.AF_INET
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock = socket.socket(family, socket.SOCK_STREAM)
         try:
-            sock.connect((host, port))
+            sock.connect(address)
         except socket.error as e:
             success = False
         else:
@@ -528,9 +2225,12 @@ class LiveServerTestCase(unittest.TestCase):
         """
         Gets the server address used to test the connection with a socket.
         Respects both the LIVESERVER_PORT config value and overriding
-        get_server_url()
+        get_server_url(). Returns the path of the socket for
+        ``http+unix://`` urls.
         """
         parts = urlparse(self.get_server_url())
+        if parts.scheme == 'http+unix':
+            return unquote(parts.netloc)
 
         host = parts.hostname
         port = parts.port
@@ -553,5 +2253,10 @@ class LiveServerTestCase(unittest.TestCase):
             del self._ctx
 
     def _terminate_live_server(self):
-        if self._process:
-            self._process.terminate()
+        handle = getattr(self, '_process', None) \
+            or getattr(self, '_server_thread', None)
+
+        if handle:
+            timeout = self.app.config.get('LIVESERVER_SHUTDOWN_TIMEOUT', 5)
+            self.live_server_shutdown_time = _shutdown_live_server(handle, timeout)
+        _remove_unix_socket(self._unix_socket, self._unix_socket_dir)
@@ -1,12 +1,33 @@
+import sys
 import unittest
 
 from flask_testing import is_twill_available
 
 from .test_twill import TestTwill, TestTwillDeprecated
+from .test_load import TestLoadTestCase
+from .test_memory import TestMemoryProfile
+from .test_snapshot import TestAppSnapshot
+from .test_runner import TestParallelTestRunner
+from .test_timing import TestPhaseTimings
 from .test_utils import TestSetup, TestSetupFailure, TestClientUtils, \
         TestLiveServer, TestTeardownGraceful, TestRenderTemplates, \
         TestNotRenderTemplates, TestRestoreTheRealRender, \
-        TestLiveServerOSPicksPort
+        TestLiveServerOSPicksPort, TestCreateAppScope, \
+        TestResponseClassCache, TestLiveServerScope, TestLiveServerCustomUrl, \
+        TestLiveServerStartupFailure, TestLiveServerOptions, \
+        TestConcurrentLiveServers, TestLiveServerUnixSocket, \
+        TestLiveServerThreadBackend, \
+        TestLiveServerShutdown, TestRecordedTemplates, TestTemplateNamesOnly, \
+        TestWeakTemplateContext, TestDeclaredTemplateContext, TestGCPolicy, \
+        TestLazyRequestContext, TestRequestContextEnviron, TestSignalDispatcher, \
+        TestClientBatch, TestCollectionAssertions, TestRequestTimings
+
+
+try:
+    import flask_sqlalchemy
+    is_sqlalchemy_available = True
+except ImportError:
+    is_sqlalchemy_available = False
 
 
 def suite():
@@ -16,10 +37,44 @@ def suite():
     suite.addTest(unittest.makeSuite(TestClientUtils))
     suite.addTest(unittest.makeSuite(TestLiveServer))
     suite.addTest(unittest.makeSuite(TestLiveServerOSPicksPort))
+    suite.addTest(unittest.makeSuite(TestLiveServerCustomUrl))
+    suite.addTest(unittest.makeSuite(TestLiveServerStartupFailure))
+    suite.addTest(unittest.makeSuite(TestLiveServerOptions))
+    suite.addTest(unittest.makeSuite(TestConcurrentLiveServers))
+    suite.addTest(unittest.makeSuite(TestLiveServerUnixSocket))
+    suite.addTest(unittest.makeSuite(TestLiveServerThreadBackend))
+    suite.addTest(unittest.makeSuite(TestLiveServerShutdown))
     suite.addTest(unittest.makeSuite(TestTeardownGraceful))
     suite.addTest(unittest.makeSuite(TestRenderTemplates))
+    suite.addTest(unittest.makeSuite(TestRecordedTemplates))
+    suite.addTest(unittest.makeSuite(TestTemplateNamesOnly))
+    suite.addTest(unittest.makeSuite(TestWeakTemplateContext))
+    suite.addTest(unittest.makeSuite(TestDeclaredTemplateContext))
     suite.addTest(unittest.makeSuite(TestNotRenderTemplates))
     suite.addTest(unittest.makeSuite(TestRestoreTheRealRender))
+    suite.addTest(unittest.makeSuite(TestCreateAppScope))
+    suite.addTest(unittest.makeSuite(TestResponseClassCache))
+    suite.addTest(unittest.makeSuite(TestLiveServerScope))
+    suite.addTest(unittest.makeSuite(TestGCPolicy))
+    suite.addTest(unittest.makeSuite(TestLazyRequestContext))
+    suite.addTest(unittest.makeSuite(TestRequestContextEnviron))
+    suite.addTest(unittest.makeSuite(TestSignalDispatcher))
+    suite.addTest(unittest.makeSuite(TestClientBatch))
+    suite.addTest(unittest.makeSuite(TestCollectionAssertions))
+    suite.addTest(unittest.makeSuite(TestRequestTimings))
+    suite.addTest(unittest.makeSuite(TestParallelTestRunner))
+    suite.addTest(unittest.makeSuite(TestPhaseTimings))
+    suite.addTest(unittest.makeSuite(TestLoadTestCase))
+    suite.addTest(unittest.makeSuite(TestMemoryProfile))
+    suite.addTest(unittest.makeSuite(TestAppSnapshot))
+    if sys.version_info >= (3, 5):
+        from .test_aio import TestLiveClient
+        suite.addTest(unittest.makeSuite(TestLiveClient))
+    if is_sqlalchemy_available:
+        from .test_database import TestTransactionIsolation
+        suite.addTest(unittest.makeSuite(TestTransactionIsolation))
+    else:
+        print("!!! Skipping tests of database isolation\n")
     if is_twill_available:
         suite.addTest(unittest.makeSuite(TestTwill))
         suite.addTest(unittest.makeSuite(TestTwillDeprecated))
@@ -0,0 +1,587 @@
+"""
+Micro-benchmarks for the flask_testing test case lifecycle.
+
+These are not part of the test suite; run them with::
+
+    python -m tests.benchmarks [name ...]
+"""
+from __future__ import print_function
+
+import gc
+import json
+import sys
+import time
+from unittest import TestResult
+
+try:
+    from urllib2 import urlopen
+except ImportError:
+    from urllib.request import urlopen
+
+from flask import Response, json as flask_json, render_template, request, \
+    template_rendered, message_flashed
+
+from flask_testing import TestCase, LiveServerTestCase, GCPolicy, AppSnapshot
+from flask_testing.utils import _make_request_context, _release_live_servers, \
+    _release_scoped_apps, _signal_dispatcher
+from .flask_app import create_app
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def report(label, seconds, iterations):
+    print("  %-40s %10.1f us/iter  (%d iterations, %.3fs total)" % (
+        label, seconds / iterations * 1e6, iterations, seconds))
+
+
+def time_lifecycle(test, iterations):
+    """
+    Runs ``_pre_setup``/``_post_teardown`` of a test case ``iterations``
+    times and returns the total elapsed time.
+    """
+    start = time.time()
+    for _ in range(iterations):
+        test._pre_setup()
+        test._post_teardown()
+    return time.time() - start
+
+
+class _PerTestApp(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def runTest(self):
+        pass
+
+
+class _ClassScopedApp(_PerTestApp):
+
+    create_app_scope = 'class'
+
+
+@benchmark
+def create_app_scope(iterations=500):
+    """Per-test setup cost with and without ``create_app_scope``."""
+    for cls in (_PerTestApp, _ClassScopedApp):
+        label = "create_app_scope=%r" % cls.create_app_scope
+        report(label, time_lifecycle(cls(), iterations), iterations)
+
+
+@benchmark
+def response_class_cache(iterations=10000):
+    """``_pre_setup``/``_post_teardown`` cost and memory growth."""
+    import tracemalloc
+
+    test = _ClassScopedApp()
+    test._pre_setup()
+    test._post_teardown()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    elapsed = time_lifecycle(test, iterations)
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    report("lifecycle (traced)", elapsed, iterations)
+    print("  %-40s %10d bytes" % ("memory growth", growth))
+
+
+class _PerTestLiveServer(LiveServerTestCase):
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_PORT'] = 0
+        return app
+
+    def runTest(self):
+        urlopen(self.get_server_url()).read()
+
+
+class _ClassScopedLiveServer(_PerTestLiveServer):
+
+    live_server_scope = 'class'
+
+
+@benchmark
+def live_server_scope(iterations=50):
+    """Wall time of trivial live server tests with and without a scope."""
+    for cls in (_PerTestLiveServer, _ClassScopedLiveServer):
+        result = TestResult()
+        start = time.time()
+        for _ in range(iterations):
+            cls()(result)
+        elapsed = time.time() - start
+        _release_live_servers()
+
+        assert result.wasSuccessful(), result.errors + result.failures
+        report("live_server_scope=%r" % cls.live_server_scope,
+               elapsed, iterations)
+
+
+class _ThreadLiveServer(_PerTestLiveServer):
+
+    def create_app(self):
+        app = super(_ThreadLiveServer, self).create_app()
+        app.config['LIVESERVER_BACKEND'] = 'thread'
+        return app
+
+
+@benchmark
+def live_server_backend(iterations=50):
+    """Wall time of trivial live server tests for each backend."""
+    for label, cls in (('process', _PerTestLiveServer),
+                       ('thread', _ThreadLiveServer)):
+        result = TestResult()
+        start = time.time()
+        for _ in range(iterations):
+            cls()(result)
+        elapsed = time.time() - start
+
+        assert result.wasSuccessful(), result.errors + result.failures
+        report("LIVESERVER_BACKEND=%r" % label, elapsed, iterations)
+
+
+@benchmark
+def live_requests(iterations=500):
+    """Sequential ``urlopen`` calls compared to ``live_requests``."""
+    if sys.version_info < (3, 5):
+        print("  requires Python 3.5")
+        return
+
+    test = _ThreadLiveServer()
+    result = TestResult()
+
+    def run():
+        url = test.get_server_url()
+        start = time.time()
+        for _ in range(iterations):
+            urlopen(url).read()
+        report("urlopen in a loop", time.time() - start, iterations)
+
+        for connections in (1, 10):
+            start = time.time()
+            responses = test.live_requests(['/'] * iterations,
+                                           connections=connections)
+            report("live_requests, %d connections" % connections,
+                   time.time() - start, iterations)
+            test.assertAllStatus(responses, 200)
+
+    test.runTest = run
+    test(result)
+    assert result.wasSuccessful(), result.errors + result.failures
+
+
+@benchmark
+def request_log(iterations=500):
+    """Requests to a thread backend live server for each request log mode."""
+    if sys.version_info < (3, 5):
+        print("  requires Python 3.5")
+        return
+
+    for request_log in (True, 'buffered', False):
+        class Test(_ThreadLiveServer):
+            def create_app(self):
+                app = super(Test, self).create_app()
+                app.config['LIVESERVER_REQUEST_LOG'] = request_log
+                return app
+
+        test = Test()
+        result = TestResult()
+
+        def run():
+            start = time.time()
+            test.live_requests(['/'] * iterations)
+            report("LIVESERVER_REQUEST_LOG=%r" % request_log,
+                   time.time() - start, iterations)
+
+        test.runTest = run
+        test(result)
+        assert result.wasSuccessful(), result.errors + result.failures
+
+
+@benchmark
+def unix_socket(iterations=2000):
+    """Sequential requests to a live server over TCP and a Unix socket."""
+    for unix_socket in (False, True):
+        class Test(_ThreadLiveServer):
+            def create_app(self):
+                app = super(Test, self).create_app()
+                app.config['LIVESERVER_REQUEST_LOG'] = False
+                app.config['LIVESERVER_UNIX_SOCKET'] = unix_socket
+                return app
+
+        test = Test()
+        result = TestResult()
+
+        def run():
+            label = "Unix socket" if unix_socket else "TCP"
+            connection = test.live_connection()
+            try:
+                start = time.time()
+                for _ in range(iterations):
+                    connection.request('GET', '/')
+                    connection.getresponse().read()
+                report(label + ", kept alive", time.time() - start, iterations)
+            finally:
+                connection.close()
+
+            start = time.time()
+            for _ in range(iterations):
+                connection = test.live_connection()
+                connection.request('GET', '/')
+                connection.getresponse().read()
+                connection.close()
+            report(label + ", new connections", time.time() - start,
+                   iterations)
+
+        test.runTest = run
+        test(result)
+        assert result.wasSuccessful(), result.errors + result.failures
+
+
+class _Page(object):
+
+    def __init__(self, size):
+        self.rows = [dict(id=i, name='row %d' % i) for i in range(size)]
+
+
+class _HeavyContext(_ClassScopedApp):
+
+    def create_app(self):
+        app = super(_HeavyContext, self).create_app()
+
+        @app.route('/heavy/')
+        def heavy():
+            return render_template('index.html', title='heavy', page=_Page(2000))
+
+        return app
+
+
+@benchmark
+def template_context_capture(iterations=20):
+    """Memory retained by recorded contexts of heavy renders in one test."""
+    import tracemalloc
+
+    for capture in ('full', 'weak', ('title',), None):
+        test = type('_Capture', (_HeavyContext,), dict(
+            template_context_capture=capture
+        ))()
+        test._pre_setup()
+        test.client.get('/heavy/')
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(iterations):
+            test.client.get('/heavy/')
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        test._post_teardown()
+
+        print("  %-40s %10d bytes  (%d renders)" % (
+            "template_context_capture=%r" % (capture,), retained, iterations))
+
+
+class _LargeJson(_ClassScopedApp):
+
+    records = 50000
+
+    def create_app(self):
+        app = super(_LargeJson, self).create_app()
+        records = [dict(id=i, name='record %d' % i, tags=['a', 'b'])
+                   for i in range(self.records)]
+        body = json.dumps(records)
+        lines = '\n'.join(json.dumps(record) for record in records)
+
+        @app.route('/large/')
+        def large():
+            return Response(body, mimetype='application/json')
+
+        @app.route('/large.ndjson')
+        def large_ndjson():
+            return Response(lines, mimetype='application/x-ndjson')
+
+        return app
+
+
+@benchmark
+def json_decoding(iterations=5):
+    """Decoding a multi-megabyte JSON body with each available module."""
+    modules = [('flask.json', flask_json), ('json', json)]
+    for name in ('orjson', 'ujson'):
+        try:
+            modules.append((name, __import__(name)))
+        except ImportError:
+            print("  %-40s not installed" % name)
+
+    test = _LargeJson()
+    test._pre_setup()
+    try:
+        size = len(test.client.get('/large/').data)
+        print("  payload: %d bytes, %d records" % (size, test.records))
+
+        for name, module in modules:
+            responses = [test.client.get('/large/') for _ in range(iterations)]
+            start = time.time()
+            for response in responses:
+                response.json_module = module
+                response.json
+            report("response.json with %s" % name,
+                   time.time() - start, iterations)
+
+        responses = [test.client.get('/large.ndjson') for _ in range(iterations)]
+        start = time.time()
+        for response in responses:
+            for record in response.iter_json_lines():
+                pass
+        report("response.iter_json_lines()", time.time() - start, iterations)
+    finally:
+        test._post_teardown()
+
+
+@benchmark
+def gc_policy(iterations=100):
+    """Lifecycle cost of ``run_gc_after_test`` with a large live object graph."""
+    # Stands in for the module level state of a large application
+    graph = [{'id': i, 'children': [[i]]} for i in range(200000)]
+
+    policies = [
+        ('full collection', True),
+        ('GCPolicy(generation=1)', GCPolicy(generation=1)),
+        ('GCPolicy(generation=1, full_every=50)',
+         GCPolicy(generation=1, full_every=50)),
+    ]
+    if hasattr(gc, 'freeze'):
+        policies.append(('full collection after gc.freeze()', 'freeze'))
+
+    for label, policy in policies:
+        if policy == 'freeze':
+            gc.collect()
+            gc.freeze()
+            policy = True
+
+        class Test(_PerTestApp):
+            run_gc_after_test = policy
+
+        try:
+            report(label, time_lifecycle(Test(), iterations), iterations)
+        finally:
+            if hasattr(gc, 'unfreeze'):
+                gc.unfreeze()
+
+    del graph
+
+
+class _LazyContextApp(_ClassScopedApp):
+
+    lazy_request_context = True
+
+
+@benchmark
+def request_context(iterations=2000):
+    """Per-test cost of the request context, used or not by the test."""
+    for label, cls in (('eager', _ClassScopedApp),
+                       ('lazy', _LazyContextApp)):
+        test = cls()
+        report("%s, unused" % label, time_lifecycle(test, iterations),
+               iterations)
+
+        start = time.time()
+        for _ in range(iterations):
+            test._pre_setup()
+            request.path
+            test._post_teardown()
+        report("%s, used" % label, time.time() - start, iterations)
+
+    app = create_app()
+    start = time.time()
+    for _ in range(iterations):
+        app.test_request_context()
+    report("app.test_request_context()", time.time() - start, iterations)
+
+    start = time.time()
+    for _ in range(iterations):
+        _make_request_context(app)
+    report("from the environ template", time.time() - start, iterations)
+
+
+@benchmark
+def signal_dispatch(iterations=20000):
+    """Subscribing a test to the template and flash signals."""
+    test = _PerTestApp()
+    app = create_app()
+
+    # Receivers of other apps, as connected by extensions
+    others = [(create_app(), lambda *args, **kwargs: None) for _ in range(100)]
+    for other, receiver in others:
+        template_rendered.connect(receiver, other)
+
+    start = time.time()
+    for _ in range(iterations):
+        template_rendered.connect(test._add_template)
+        message_flashed.connect(test._add_flash_message)
+        template_rendered.disconnect(test._add_template)
+        message_flashed.disconnect(test._add_flash_message)
+    report("connect/disconnect per test", time.time() - start, iterations)
+
+    start = time.time()
+    for _ in range(iterations):
+        _signal_dispatcher.activate(test, app)
+        _signal_dispatcher.deactivate(test, app)
+    report("dispatcher activate/deactivate", time.time() - start, iterations)
+
+    for other, receiver in others:
+        template_rendered.disconnect(receiver, other)
+
+
+@benchmark
+def client_batch(iterations=5000):
+    """Sending many small requests with the client and ``client_batch``."""
+    test = _PerTestApp()
+    test._pre_setup()
+    try:
+        paths = ['/redirect/?code=%d' % (301 + i % 2) for i in range(iterations)]
+
+        start = time.time()
+        for path in paths:
+            test.client.get(path)
+        report("client.get in a loop", time.time() - start, iterations)
+
+        start = time.time()
+        test.client_batch(paths)
+        report("client_batch", time.time() - start, iterations)
+
+        start = time.time()
+        test.client_batch(paths, workers=4)
+        report("client_batch, 4 threads", time.time() - start, iterations)
+    finally:
+        test._post_teardown()
+
+
+@benchmark
+def status_assertions(iterations=5000):
+    """Checking the status of many passing responses."""
+    test = _PerTestApp()
+    test._pre_setup()
+    try:
+        responses = test.client_batch(['/'] * iterations)
+
+        start = time.time()
+        for response in responses:
+            test.assert200(response)
+        report("assert200 in a loop", time.time() - start, iterations)
+
+        start = time.time()
+        test.assertAllStatus(responses, 200)
+        report("assertAllStatus", time.time() - start, iterations)
+    finally:
+        test._post_teardown()
+
+
+@benchmark
+def app_snapshot(iterations=2000):
+    """Restoring a shared application compared to building a new one."""
+    builds = max(iterations // 10, 1)
+    start = time.time()
+    for _ in range(builds):
+        create_app()
+    report("create_app", time.time() - start, builds)
+
+    app = create_app()
+    snapshot = AppSnapshot(app)
+    start = time.time()
+    for _ in range(iterations):
+        snapshot.restore()
+    report("restore, nothing changed", time.time() - start, iterations)
+
+    start = time.time()
+    for _ in range(iterations):
+        app.config['EXTRA'] = 'value'
+        app.before_request(lambda: None)
+        app.add_template_global(lambda: None, 'extra')
+        snapshot.restore()
+    report("restore, config, hook and global", time.time() - start,
+           iterations)
+
+
+@benchmark
+def transaction_isolation(iterations=200):
+    """Building the schema for every test compared to rolling tests back."""
+    import os
+    import shutil
+    import tempfile
+
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+    from flask_testing import TransactionIsolation
+
+    db = SQLAlchemy()
+    tables = [
+        db.Table('table_%d' % i,
+                 db.Column('id', db.Integer, primary_key=True),
+                 db.Column('name', db.String(20)))
+        for i in range(20)
+    ]
+    directory = tempfile.mkdtemp()
+    uri = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+
+    class Database(_ClassScopedApp):
+
+        def create_app(self):
+            app = Flask(__name__)
+            app.config['SQLALCHEMY_DATABASE_URI'] = uri
+            app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+            db.init_app(app)
+            return app
+
+        def runTest(self):
+            db.session.execute(tables[0].insert(), {'name': 'name'})
+            db.session.commit()
+
+    class CreateAll(Database):
+
+        def setUp(self):
+            db.create_all()
+
+        def tearDown(self):
+            db.session.remove()
+            db.drop_all()
+
+    class Isolated(Database):
+        database_isolation = TransactionIsolation(db)
+
+    try:
+        for label, cls in (('create_all/drop_all', CreateAll),
+                           ('TransactionIsolation', Isolated)):
+            test = cls()
+            start = time.time()
+            for _ in range(iterations):
+                test._pre_setup()
+                test.setUp()
+                test.runTest()
+                test.tearDown()
+                test._post_teardown()
+            report(label, time.time() - start, iterations)
+    finally:
+        _release_scoped_apps()
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or sorted(BENCHMARKS)
+    for name in names:
+        print(name)
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,10 @@ def create_app():
     def index_with_template():
         return render_template("index.html", name="test")
 
+    @app.route("/other_template/")
+    def other_template():
+        return render_template("other.html", other="value")
+
     @app.route("/flash/")
     def index_with_flash():
         flash("Flashed message")
@@ -50,6 +54,19 @@ def create_app():
     def ajax():
         return jsonify(**dict(name="test"))
 
+    @app.route("/ndjson/")
+    def ndjson():
+        # Records deliberately span chunk boundaries
+        chunks = [b'{"id": 0}\n{"i', b'd": 1}\n', b'\n{"id": 2,', b' "last": true}']
+        return Response(iter(chunks), mimetype="application/x-ndjson")
+
+    @app.route("/echo/<value>/", methods=["GET", "POST"])
+    def echo(value):
+        return jsonify(method=request.method, value=value,
+                       args=request.args.to_dict(),
+                       data=request.get_data(as_text=True),
+                       cookie=request.cookies.get('name'))
+
     @app.route("/forbidden/")
     def forbidden():
         abort(403)
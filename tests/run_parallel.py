@@ -0,0 +1,13 @@
+import sys
+
+from flask_testing.runner import ParallelTestRunner
+
+
+def run(workers=None):
+    from tests import suite
+    result = ParallelTestRunner(workers=workers, verbosity=2).run(suite())
+    if not result.wasSuccessful():
+        sys.exit(1)
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from unittest import TestResult
+
+from flask import request
+
+from flask_testing import LiveServerTestCase
+from flask_testing.aio import LiveClient, _run
+from .flask_app import create_app
+
+
+class TestLiveClient(LiveServerTestCase):
+
+    live_server_scope = 'class'
+
+    @classmethod
+    def setUpClass(cls):
+        # Keep the request log of the server out of the test output
+        cls._werkzeug_level = logging.getLogger('werkzeug').level
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.getLogger('werkzeug').setLevel(cls._werkzeug_level)
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = 'thread'
+        app.config['LIVESERVER_PORT'] = 0
+
+        @app.route('/remote_port/')
+        def remote_port():
+            return str(request.environ['REMOTE_PORT'])
+
+        @app.route('/slow/')
+        def slow():
+            time.sleep(0.2)
+            return 'slow'
+
+        return app
+
+    def test_many_requests(self):
+        responses = self.live_requests(['/'] * 200)
+
+        self.assertEqual(len(responses), 200)
+        self.assertAllStatus(responses, 200)
+        self.assertEqual(responses[0].data, b'OK')
+        self.assertFasterThan(responses[0], 5)
+
+    def test_responses_keep_the_order_of_the_requests(self):
+        paths = ['/echo/%d/' % i for i in range(50)]
+        responses = self.live_requests(paths)
+
+        self.assertEqual([response.request for response in responses], paths)
+        self.assertEqual([response.json['value'] for response in responses],
+                         [str(i) for i in range(50)])
+
+    def test_connections_are_kept_alive(self):
+        responses = self.live_requests(['/remote_port/'] * 40, connections=2)
+
+        ports = set(response.data for response in responses)
+        self.assertTrue(len(ports) <= 2, ports)
+
+    def test_unread_request_body_is_skipped(self):
+        responses = self.live_requests([
+            {'method': 'POST', 'path': '/redirect/', 'data': b'x' * 100000},
+            '/echo/next/',
+        ], connections=1)
+
+        self.assert405(responses[0])
+        self.assertEqual(responses[1].json['value'], 'next')
+
+    def test_request_kinds(self):
+        responses = self.live_requests([
+            ('POST', '/echo/post/?page=2'),
+            {'method': 'POST', 'path': '/echo/dict/', 'data': 'payload',
+             'headers': {'Cookie': 'name=value'}},
+            '/oops/',
+        ])
+
+        self.assertEqual(responses[0].json['method'], 'POST')
+        self.assertEqual(responses[0].json['args'], {'page': '2'})
+        self.assertEqual(responses[1].json['data'], 'payload')
+        self.assertEqual(responses[1].json['cookie'], 'value')
+        self.assert404(responses[2])
+
+    def test_redirects(self):
+        responses = self.live_requests(['/redirect/', '/external_redirect/'])
+
+        self.assertRedirects(responses[0], '/')
+        self.assertRedirects(responses[1], 'http://flask.pocoo.org/')
+
+    def test_timeout(self):
+        self.assertRaises(asyncio.TimeoutError, self.live_requests,
+                          ['/', '/slow/'], timeout=0.05)
+
+        # A request over its timeout doesn't affect the next ones
+        self.assertEqual(self.live_requests(['/'])[0].status_code, 200)
+
+    def test_async_client(self):
+        async def run():
+            async with self.live_client(headers={'Cookie': 'name=shared'}) \
+                    as client:
+                first = await client.get('/echo/first/')
+                second = await client.post('/echo/second/', data=b'body')
+                slow = await client.request('GET', '/slow/', timeout=2)
+                return first, second, slow
+
+        first, second, slow = _run(run)
+
+        self.assertEqual(first.json['cookie'], 'shared')
+        self.assertEqual(second.json['data'], 'body')
+        self.assertEqual(slow.data, b'slow')
+
+    def test_unix_socket(self):
+        class UnixSocket(TestLiveClient):
+            def create_app(self):
+                app = super(UnixSocket, self).create_app()
+                app.config['LIVESERVER_UNIX_SOCKET'] = True
+                return app
+
+            def check_requests(self):
+                assert self.get_server_url().startswith('http+unix://')
+                responses = self.live_requests(['/echo/unix/'] * 20,
+                                               connections=2)
+                self.assertAllStatus(responses, 200)
+                assert responses[0].json['value'] == 'unix'
+
+                redirects = self.live_requests(['/redirect/',
+                                                '/external_redirect/'])
+                self.assertRedirects(redirects[0], '/')
+                self.assertRedirects(redirects[1], 'http://flask.pocoo.org/')
+
+        result = TestResult()
+        UnixSocket('check_requests')(result)
+        self.assertTrue(result.wasSuccessful(), result.errors + result.failures)
+
+    def test_unsupported_scheme(self):
+        self.assertRaises(ValueError, LiveClient, 'ftp://localhost/')
@@ -0,0 +1,189 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine, inspect, text
+
+from flask_testing import TestCase, TransactionIsolation
+from flask_testing.utils import _release_scoped_apps
+
+db = SQLAlchemy()
+
+
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(20))
+
+
+def create_app(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    @app.route('/users/<name>/', methods=['POST'])
+    def add_user(name):
+        db.session.add(User(name=name))
+        db.session.commit()
+        return 'added'
+
+    @app.route('/users/<name>/failed/', methods=['POST'])
+    def add_user_failed(name):
+        db.session.add(User(name=name))
+        db.session.flush()
+        db.session.rollback()
+        return 'rolled back'
+
+    @app.route('/users/')
+    def users():
+        return jsonify(sorted(user.name for user in User.query))
+
+    return app
+
+
+class TestTransactionIsolation(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.uri = 'sqlite:///' + os.path.join(self.directory, 'test.db')
+        self.engine = create_engine(self.uri)
+
+    def tearDown(self):
+        _release_scoped_apps()
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def run_tests(self, test_class, *names):
+        result = unittest.TestResult()
+        unittest.TestSuite(map(test_class, names))(result)
+        self.assertEqual(result.errors + result.failures, [])
+        self.assertEqual(result.testsRun, len(names))
+
+    def make_test_class(self, scope='class', **options):
+        uri = self.uri
+
+        class Isolated(TestCase):
+            create_app_scope = scope
+            database_isolation = TransactionIsolation(db, **options)
+
+            def create_app(self):
+                return create_app(uri)
+
+            def check_commits_are_undone(self):
+                self.assertEqual(self.client.get('/users/').json, [])
+                self.client.post('/users/app/')
+                db.session.add(User(name='test'))
+                db.session.commit()
+                self.assertEqual(self.client.get('/users/').json,
+                                 ['app', 'test'])
+
+            def check_app_rollback(self):
+                db.session.add(User(name='committed'))
+                db.session.commit()
+                self.client.post('/users/failed/failed/')
+                self.client.post('/users/app/')
+                self.assertEqual(self.client.get('/users/').json,
+                                 ['app', 'committed'])
+
+            def check_test_rollback(self):
+                db.session.add(User(name='rolled back'))
+                db.session.rollback()
+                self.client.post('/users/app/')
+                self.assertEqual(User.query.count(), 1)
+
+        return Isolated
+
+    def test_tests_dont_see_each_others_data(self):
+        Isolated = self.make_test_class()
+        self.run_tests(Isolated, 'check_commits_are_undone',
+                       'check_app_rollback', 'check_commits_are_undone',
+                       'check_test_rollback', 'check_commits_are_undone')
+
+    def test_one_connection_per_scope(self):
+        Isolated = self.make_test_class()
+        isolation = Isolated.database_isolation
+        connections = []
+
+        class Recorded(Isolated):
+            def check_connection(self):
+                connections.append(isolation.connection)
+
+        self.run_tests(Recorded, 'check_connection', 'check_connection')
+        self.assertTrue(connections[0] is connections[1])
+
+        # Released along with the app once the class is done
+        self.assertTrue(connections[0].closed)
+        self.assertTrue(isolation.connection is None)
+
+    def test_database_is_unlocked_once_the_class_is_done(self):
+        if not hasattr(TestCase, 'addClassCleanup'):
+            self.skipTest("class cleanups require Python 3.8+")
+
+        self.run_tests(self.make_test_class(), 'check_commits_are_undone')
+
+        # Fails right away instead of waiting for a lock still held
+        engine = create_engine(self.uri, connect_args={'timeout': 0})
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("CREATE TABLE other (id INTEGER)"))
+            self.assertEqual(inspect(engine).get_table_names(), ['other'])
+        finally:
+            engine.dispose()
+
+    def test_schema_is_rolled_back_with_the_scope(self):
+        self.run_tests(self.make_test_class(), 'check_commits_are_undone')
+
+        self.assertEqual(inspect(self.engine).get_table_names(), [])
+
+    def test_app_per_test(self):
+        Isolated = self.make_test_class(scope=None)
+        self.run_tests(Isolated, 'check_commits_are_undone',
+                       'check_commits_are_undone')
+
+        self.assertTrue(Isolated.database_isolation.connection is None)
+        self.assertEqual(inspect(self.engine).get_table_names(), [])
+
+    def test_existing_schema_and_data_are_kept(self):
+        db.Model.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(text("INSERT INTO user (name) VALUES ('kept')"))
+
+        Isolated = self.make_test_class(create_schema=False)
+
+        class Deleting(Isolated):
+            def check_delete(self):
+                self.assertEqual(self.client.get('/users/').json, ['kept'])
+                User.query.delete()
+                db.session.commit()
+                self.assertEqual(User.query.count(), 0)
+
+        self.run_tests(Deleting, 'check_delete', 'check_delete')
+
+        with self.engine.connect() as connection:
+            names = connection.execute(text("SELECT name FROM user"))
+            self.assertEqual([row[0] for row in names], ['kept'])
+
+    def test_session_is_restored(self):
+        session = db.session
+        Isolated = self.make_test_class()
+
+        class Swapped(Isolated):
+            def check_session(self):
+                assert db.session is self.database_isolation.session
+                assert db.session is not session
+
+        self.run_tests(Swapped, 'check_session')
+        self.assertTrue(db.session is session)
+
+    def test_in_memory_database(self):
+        Isolated = self.make_test_class()
+
+        class InMemory(Isolated):
+            def create_app(self):
+                return create_app('sqlite://')
+
+        self.run_tests(InMemory, 'check_commits_are_undone',
+                       'check_app_rollback', 'check_commits_are_undone')
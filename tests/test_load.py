@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from flask_testing.load import LoadResult, LoadTestCase, UPDATE_BASELINES_ENV
+from .flask_app import create_app
+
+
+class TestLoadTestCase(LoadTestCase):
+
+    live_server_scope = 'class'
+    load_report = False
+
+    @classmethod
+    def setUpClass(cls):
+        # Keep the request log of the server out of the test output
+        cls._werkzeug_level = logging.getLogger('werkzeug').level
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.getLogger('werkzeug').setLevel(cls._werkzeug_level)
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = 'thread'
+        app.config['LIVESERVER_PORT'] = 0
+        return app
+
+    def setUp(self):
+        self.baseline_dir = tempfile.mkdtemp()
+        self.load_baseline_dir = self.baseline_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.baseline_dir)
+
+    def test_fixed_number_of_requests(self):
+        result = self.run_load('/', requests=40, concurrency=4, warmup=4)
+
+        self.assertEqual(result.requests, 40)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.statuses, {200: 40})
+        self.assertTrue(result.requests_per_second > 0)
+        self.assertTrue(0 < result.p50 <= result.p95 <= result.p99)
+
+    def test_duration(self):
+        result = self.run_load('/ajax/', requests=None, duration=0.2,
+                               concurrency=2)
+
+        self.assertTrue(result.requests > 0)
+        self.assertTrue(result.elapsed >= 0.2)
+
+    def test_statuses_are_counted(self):
+        result = self.run_load('/oops/', requests=10, method='POST',
+                               data=b'payload')
+
+        self.assertEqual(result.statuses, {405: 10})
+
+    def test_asyncio_client(self):
+        if sys.version_info < (3, 5):
+            self.skipTest("the asyncio client requires Python 3.5")
+
+        self.load_client = 'asyncio'
+        result = self.run_load('/echo/value/?page=2', requests=30, concurrency=3)
+
+        self.assertEqual(result.requests, 30)
+        self.assertEqual(result.statuses, {200: 30})
+
+    def test_unknown_client(self):
+        self.load_client = 'gevent'
+        self.assertRaises(ValueError, self.run_load, '/', requests=1)
+
+    def test_latency_and_throughput_assertions(self):
+        result = self.run_load('/', requests=20)
+
+        self.assertLatencyBelow(result, 10)
+        self.assertThroughputAbove(result, 0)
+        self.assertRaises(AssertionError, self.assertLatencyBelow, result, 0)
+        self.assertRaises(AssertionError, self.assertThroughputAbove, result,
+                          1e9)
+
+    def test_baselines(self):
+        result = self.run_load('/', requests=20)
+
+        # The first run records the baseline
+        self.assertNoRegression(result, name='index')
+        path = os.path.join(self.baseline_dir, 'index.json')
+        with open(path) as baseline_file:
+            self.assertEqual(json.load(baseline_file)['requests'], 20)
+        self.assertNoRegression(result, name='index')
+
+        slower = LoadResult([latency * 2 for latency in result.latencies],
+                            result.statuses, 0, result.elapsed * 2, 4)
+        try:
+            self.assertNoRegression(slower, name='index')
+        except AssertionError as e:
+            self.assertTrue('p95 latency' in str(e))
+            self.assertTrue('throughput' in str(e))
+        else:
+            self.fail("assertNoRegression didn't fail")
+
+        os.environ[UPDATE_BASELINES_ENV] = '1'
+        try:
+            self.assertNoRegression(slower, name='index')
+        finally:
+            del os.environ[UPDATE_BASELINES_ENV]
+        self.assertNoRegression(slower, name='index')
+
+    def test_percentiles(self):
+        result = LoadResult([i / 100.0 for i in range(100, 0, -1)], {200: 100},
+                            0, 1.0, 1)
+
+        self.assertEqual(result.p50, 0.5)
+        self.assertEqual(result.p95, 0.95)
+        self.assertEqual(result.p99, 0.99)
+        self.assertEqual(result.percentile(100), 1.0)
+        self.assertEqual(result.requests_per_second, 100)
+        self.assertEqual(LoadResult([], {}, 3, 1.0, 1).p50, None)
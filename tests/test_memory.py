@@ -0,0 +1,129 @@
+from unittest import TestResult
+
+from flask_testing import TestCase
+from flask_testing.memory import MemoryProfiles, memory_profiles, tracemalloc
+from .flask_app import create_app
+
+_leaked = []
+
+
+class _ProfiledTest(TestCase):
+
+    memory_profile = True
+
+    def create_app(self):
+        return create_app()
+
+    def check_leak(self):
+        _leaked.append(b'x' * (1024 * 1024))
+
+    def check_no_leak(self):
+        data = b'x' * (1024 * 1024)
+        self.assertEqual(len(data), 1024 * 1024)
+
+    def check_requests(self):
+        self.client.get("/")
+        self.client.get("/echo/value/")
+
+
+class TestMemoryProfile(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def setUp(self):
+        if tracemalloc is None:
+            self.skipTest("memory profiling requires Python 3.4")
+
+    def tearDown(self):
+        del _leaked[:]
+
+    def _run(self, test):
+        test_result = TestResult()
+        test(test_result)
+        entries = [entry for entry in memory_profiles.tests
+                   if entry['test'] == test.id()]
+        return test_result, entries[-1]
+
+    def test_retained_memory_is_recorded(self):
+        test_result, leak = self._run(_ProfiledTest('check_leak'))
+        self.assertTrue(test_result.wasSuccessful())
+
+        test_result, no_leak = self._run(_ProfiledTest('check_no_leak'))
+        self.assertTrue(test_result.wasSuccessful())
+
+        self.assertTrue(leak['retained'] > 900 * 1024)
+        self.assertTrue(leak['retained'] - no_leak['retained'] > 900 * 1024)
+        self.assertTrue(leak['sites'][0]['site'].startswith(__file__.rstrip('c')))
+        self.assertTrue(leak['sites'][0]['size'] >= 1024 * 1024)
+
+    def test_threshold(self):
+        class Limited(_ProfiledTest):
+            memory_threshold = 512 * 1024
+
+        test_result, entry = self._run(Limited('check_leak'))
+
+        self.assertEqual(test_result.testsRun, 1)
+        self.assertEqual(len(test_result.failures), 1)
+        self.assertTrue("over the memory_threshold" in test_result.failures[0][1])
+
+        test_result, entry = self._run(Limited('check_no_leak'))
+        self.assertTrue(test_result.wasSuccessful())
+
+    def test_requests(self):
+        class Requests(_ProfiledTest):
+            memory_profile = 'requests'
+
+        test_result, entry = self._run(Requests('check_requests'))
+
+        self.assertTrue(test_result.wasSuccessful())
+        self.assertEqual([request['endpoint'] for request in entry['requests']],
+                         ['GET /', 'GET /echo/<value>/'])
+
+    def test_tracing_is_stopped(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        test_result, entry = self._run(_ProfiledTest('check_leak'))
+
+        self.assertTrue(test_result.wasSuccessful())
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_tracing_is_stopped_after_failed_setup(self):
+        class Broken(_ProfiledTest):
+            def create_app(self):
+                raise RuntimeError("broken")
+
+        test_result = TestResult()
+        self.assertRaises(RuntimeError, Broken('check_leak'), test_result)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_tracing_started_elsewhere_is_kept(self):
+        tracemalloc.start()
+        try:
+            test_result, entry = self._run(_ProfiledTest('check_no_leak'))
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_teardown_runs_once(self):
+        test = _ProfiledTest('check_no_leak')
+        self._run(test)
+
+        self.assertTrue(test._torn_down)
+        self.assertFalse(hasattr(test, 'app'))
+
+    def test_reports(self):
+        profiles = MemoryProfiles()
+        profiles.tests = [
+            {'test': 'a.A.test_small', 'class': 'a.A', 'retained': 1024,
+             'sites': []},
+            {'test': 'a.A.test_large', 'class': 'a.A', 'retained': 4096,
+             'sites': [{'site': 'a.py:1', 'size': 4096, 'count': 1}]},
+        ]
+
+        self.assertEqual([entry['test'] for entry in profiles.largest()],
+                         ['a.A.test_large', 'a.A.test_small'])
+
+        summary = profiles.summary(count=1)
+        self.assertTrue('a.A.test_large' in summary)
+        self.assertTrue('a.py:1' in summary)
+        self.assertFalse('a.A.test_small' in summary)
@@ -0,0 +1,144 @@
+import os
+import time
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from flask_testing import TestCase, LiveServerTestCase
+from flask_testing.runner import ParallelTestRunner, _partition
+from flask_testing.utils import WORKER_ID_ENV, _live_servers, \
+    _release_live_servers
+from .flask_app import create_app
+
+
+class _WorkerChecks(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def check_worker_id(self):
+        self.assertTrue(self.worker_id in (0, 1))
+
+    def check_failure(self):
+        self.fail('failed in the worker')
+
+    def check_error(self):
+        raise ValueError('raised in the worker')
+
+    @unittest.skip('skipped in the worker')
+    def check_skip(self):
+        pass
+
+    def check_hang(self):
+        time.sleep(60)
+
+
+class _LiveServerWorkerChecks(LiveServerTestCase):
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_PORT'] = 8943
+        return app
+
+    def check_port_is_picked_by_os(self):
+        self.assertEqual(self._configured_port, 0)
+        self.assertNotEqual(self._port_value.value, 0)
+
+
+class _SharedThreadLiveServer(LiveServerTestCase):
+
+    live_server_scope = 'class'
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = 'thread'
+        app.config['LIVESERVER_PORT'] = 0
+        app.config['LIVESERVER_REQUEST_LOG'] = False
+        return app
+
+    def check_server(self):
+        self.assertNotEqual(self._port_value.value, 0)
+
+
+class TestParallelTestRunner(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def _run(self, *tests, **kwargs):
+        runner = ParallelTestRunner(workers=kwargs.get('workers', 2),
+                                    timeout=kwargs.get('timeout', 30),
+                                    stream=StringIO())
+        return runner.run(unittest.TestSuite(tests))
+
+    def test_tests_run_in_workers(self):
+        result = self._run(
+            _WorkerChecks('check_worker_id'),
+            _LiveServerWorkerChecks('check_port_is_picked_by_os'),
+        )
+
+        self.assertEqual(result.testsRun, 2)
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+
+    def test_outcomes_are_merged(self):
+        failure = _WorkerChecks('check_failure')
+        error = _WorkerChecks('check_error')
+        skip = _WorkerChecks('check_skip')
+        result = self._run(failure, error, skip)
+
+        self.assertEqual(result.testsRun, 3)
+        self.assertEqual([test for test, _ in result.failures], [failure])
+        self.assertTrue('failed in the worker' in result.failures[0][1])
+        self.assertEqual([test for test, _ in result.errors], [error])
+        self.assertTrue('raised in the worker' in result.errors[0][1])
+        self.assertEqual(result.skipped, [(skip, 'skipped in the worker')])
+
+    def test_stuck_worker_is_terminated(self):
+        hang = _WorkerChecks('check_hang')
+        start = time.time()
+        result = self._run(hang, _WorkerChecks('check_worker_id'),
+                           workers=1, timeout=1)
+
+        self.assertTrue(time.time() - start < 30)
+        self.assertEqual([test for test, _ in result.errors], [hang])
+        self.assertTrue('2 of its tests didn\'t run' in result.errors[0][1])
+
+    def test_shared_live_servers_are_not_inherited(self):
+        # A thread server shared by the tests of this process: the workers
+        # forked from it don't have its thread, and must not stop it.
+        shared = _SharedThreadLiveServer('check_server')
+        shared(unittest.TestResult())
+        try:
+            self.assertEqual(len(_live_servers), 1)
+            result = self._run(
+                _LiveServerWorkerChecks('check_port_is_picked_by_os'),
+                workers=1, timeout=10)
+
+            self.assertTrue(result.wasSuccessful(),
+                            result.failures + result.errors)
+            self.assertEqual(len(_live_servers), 1)
+        finally:
+            _release_live_servers()
+
+    def test_worker_id_is_none_outside_of_workers(self):
+        worker_id = os.environ.pop(WORKER_ID_ENV, None)
+        try:
+            self.assertEqual(self.worker_id, None)
+        finally:
+            if worker_id is not None:
+                os.environ[WORKER_ID_ENV] = worker_id
+
+    def test_tests_of_a_class_stay_together(self):
+        tests = [
+            _WorkerChecks('check_worker_id'),
+            _LiveServerWorkerChecks('check_port_is_picked_by_os'),
+            _WorkerChecks('check_failure'),
+        ]
+        chunks = _partition(tests, 2)
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([index for index, _ in chunks[0]], [0, 2])
+        self.assertEqual([index for index, _ in chunks[1]], [1])
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from flask import Blueprint
+
+from flask_testing import AppSnapshot
+from .flask_app import create_app
+
+
+class TestAppSnapshot(TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config['SETTINGS'] = {'retries': 3}
+        self.app.extensions['cache'] = object()
+        self.app.before_request(self.before_request)
+        self.snapshot = AppSnapshot(self.app)
+
+    def before_request(self):
+        pass
+
+    def test_nothing_to_restore(self):
+        self.assertEqual(self.snapshot.restore(), [])
+
+    def test_config_is_restored(self):
+        settings = self.app.config['SETTINGS']
+        self.app.config['SECRET_KEY'] = 'changed'
+        self.app.config['EXTRA'] = 'value'
+        del self.app.config['SETTINGS']
+
+        self.assertEqual(self.snapshot.restore(), ['config'])
+        self.assertEqual(self.app.config['SECRET_KEY'],
+                         'super secret testing key')
+        self.assertFalse('EXTRA' in self.app.config)
+        self.assertTrue(self.app.config['SETTINGS'] is settings)
+
+    def test_values_changed_in_place_are_kept(self):
+        self.app.config['SETTINGS']['retries'] = 5
+
+        self.assertEqual(self.snapshot.restore(), [])
+        self.assertEqual(self.app.config['SETTINGS'], {'retries': 5})
+
+    def test_extensions_are_restored(self):
+        cache = self.app.extensions['cache']
+        self.app.extensions['cache'] = object()
+        self.app.extensions['mail'] = object()
+
+        self.assertEqual(self.snapshot.restore(), ['extensions'])
+        self.assertEqual(list(self.app.extensions), ['cache'])
+        self.assertTrue(self.app.extensions['cache'] is cache)
+
+    def test_hooks_are_restored(self):
+        functions = self.app.before_request_funcs[None]
+        self.app.before_request(lambda: None)
+        self.app.teardown_appcontext(lambda exc: None)
+        blueprint = Blueprint('extra', __name__)
+        blueprint.after_request(lambda response: response)
+        self.app.register_blueprint(blueprint)
+
+        self.assertEqual(self.snapshot.restore(), [
+            'after_request_funcs',
+            'before_request_funcs',
+            'teardown_appcontext_funcs',
+        ])
+        self.assertEqual(functions, [self.before_request])
+        self.assertTrue(self.app.before_request_funcs[None] is functions)
+        self.assertFalse('extra' in self.app.after_request_funcs)
+        self.assertEqual(self.app.teardown_appcontext_funcs, [])
+
+    def test_jinja_env_is_restored(self):
+        self.app.add_template_global(lambda: 'value', 'extra')
+        self.app.add_template_filter(lambda value: value, 'tojson')
+        tojson = self.snapshot.jinja_mappings['filters']['tojson']
+
+        self.assertEqual(self.snapshot.restore(),
+                         ['jinja_env.filters', 'jinja_env.globals'])
+        self.assertFalse('extra' in self.app.jinja_env.globals)
+        self.assertTrue(self.app.jinja_env.filters['tojson'] is tojson)
+
+    def test_restored_app_serves_requests(self):
+        self.app.config['EXTRA'] = 'value'
+        self.app.before_request(lambda: 'intercepted')
+        self.snapshot.restore()
+
+        response = self.app.test_client().get('/')
+        self.assertEqual(response.data, b'OK')
@@ -0,0 +1,94 @@
+import json
+import os
+from unittest import TestResult
+
+from flask_testing import TestCase
+from flask_testing.timing import PHASES, TIMINGS_ENV, PhaseTimings, \
+        RequestTimings, phase_timings
+from .flask_app import create_app
+
+
+class _TimedTest(TestCase):
+
+    record_timings = True
+    run_gc_after_test = True
+
+    def create_app(self):
+        return create_app()
+
+    def check_request(self):
+        self.client.get("/")
+
+
+class TestPhaseTimings(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def _entries(self, test):
+        return [entry for entry in phase_timings.tests
+                if entry['test'] == test.id()]
+
+    def test_phases_are_recorded(self):
+        test = _TimedTest('check_request')
+        test_result = TestResult()
+        test(test_result)
+
+        assert test_result.wasSuccessful()
+
+        entries = self._entries(test)
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(sorted(entries[0]['phases']), sorted(PHASES))
+        self.assertTrue(all(elapsed >= 0 for elapsed in entries[0]['phases'].values()))
+
+    def test_nothing_is_recorded_when_disabled(self):
+        if os.environ.get(TIMINGS_ENV):
+            self.skipTest("timings are enabled for the whole run")
+
+        class Untimed(_TimedTest):
+            record_timings = False
+
+        test = Untimed('check_request')
+        test(TestResult())
+
+        self.assertEqual(self._entries(test), [])
+
+    def test_reports(self):
+        timings = PhaseTimings()
+        timings.tests = [
+            {'test': 'a.A.test_fast', 'class': 'a.A',
+             'phases': {'create_app': 1000000, 'test': 5000000}},
+            {'test': 'a.A.test_slow', 'class': 'a.A',
+             'phases': {'create_app': 9000000, 'context': 1000000}},
+        ]
+
+        self.assertEqual(timings.by_class(), {
+            'a.A': {'tests': 2, 'create_app': 10000000, 'context': 1000000,
+                    'test': 5000000},
+        })
+        self.assertEqual(
+            [entry['test'] for _, entry in timings.slowest_setups()],
+            ['a.A.test_slow', 'a.A.test_fast']
+        )
+        self.assertEqual(json.loads(timings.to_json())['tests'], timings.tests)
+
+        summary = timings.summary(count=1)
+        self.assertTrue('a.A.test_slow' in summary)
+        self.assertFalse('a.A.test_fast' in summary)
+
+    def test_request_timings(self):
+        timings = RequestTimings()
+        timings.record('GET /', 0.001, 0.001)
+        timings.record('GET /', 0.003, 0.002, 4)
+        timings.record('GET /users/<int:id>/', 0.010, 0.005, 2)
+
+        self.assertEqual(timings.endpoints['GET /'], {
+            'requests': 2, 'elapsed': 0.004, 'max_elapsed': 0.003,
+            'cpu_time': 0.003, 'queries': 4,
+        })
+        self.assertEqual([endpoint for endpoint, _ in timings.slowest()],
+                         ['GET /users/<int:id>/', 'GET /'])
+
+        summary = timings.summary(count=1)
+        self.assertTrue('GET /users/<int:id>/ (1 requests' in summary)
+        self.assertFalse('GET / ' in summary)
@@ -2,9 +2,36 @@ try:
     from urllib2 import urlopen
 except ImportError:
     from urllib.request import urlopen
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+import gc
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+from multiprocessing.pool import ThreadPool
 from unittest import TestResult
-from flask_testing import TestCase, LiveServerTestCase
-from flask_testing.utils import ContextVariableDoesNotExist
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from flask import _request_ctx_stack, current_app, g, has_request_context, \
+        request, session, template_rendered, url_for
+from flask_testing import TestCase, LiveServerTestCase, GCPolicy, \
+        make_live_server
+from flask_testing.timing import request_timings
+from flask_testing.utils import ContextVariableDoesNotExist, \
+        JsonResponseMixin, _make_test_response, _live_servers, \
+        _release_live_servers, _scoped_apps, _shutdown_live_server, \
+        _make_request_context, _ServerThread
 from .flask_app import create_app
 
 
@@ -51,6 +78,51 @@ class TestClientUtils(TestCase):
         response = self.client.get("/ajax/")
         self.assertEqual(response.json, dict(name="test"))
 
+    def test_get_json_uses_json_module(self):
+        class CountingJson(object):
+            calls = 0
+
+            @classmethod
+            def loads(cls, data):
+                cls.calls += 1
+                return json.loads(data.decode('utf-8'))
+
+        response = self.client.get("/ajax/")
+        response.json_module = CountingJson
+
+        self.assertEqual(response.json, dict(name="test"))
+        self.assertEqual(response.json, dict(name="test"))
+        self.assertEqual(CountingJson.calls, 1)
+
+    def test_get_json_uses_app_decoder(self):
+        if not hasattr(self.app, 'json_decoder'):
+            self.skipTest("requires Flask < 2.2")
+
+        class MarkingDecoder(json.JSONDecoder):
+            def __init__(self, **kwargs):
+                kwargs['object_hook'] = lambda obj: dict(obj, decoded=True)
+                super(MarkingDecoder, self).__init__(**kwargs)
+
+        self.app.json_decoder = MarkingDecoder
+
+        response = self.client.get("/ajax/")
+        self.assertEqual(response.json, dict(name="test", decoded=True))
+
+        response = self.client.get("/ndjson/")
+        self.assertEqual(list(response.iter_json_lines())[0],
+                         dict(id=0, decoded=True))
+
+    def test_get_json_of_non_json_response(self):
+        response = self.client.get("/")
+        if not hasattr(response, 'is_json'):
+            self.skipTest("requires Flask 1.0+")
+        self.assertEqual(response.json, None)
+
+    def test_iter_json_lines(self):
+        response = self.client.get("/ndjson/")
+        self.assertEqual(list(response.iter_json_lines()),
+                         [dict(id=0), dict(id=1), dict(id=2, last=True)])
+
     def test_status_failure_message(self):
         expected_message = 'my message'
         try:
@@ -224,6 +296,9 @@ class BaseTestLiveServer(LiveServerTestCase):
         self.assertTrue(b'OK' in response.read())
         self.assertEqual(response.code, 200)
 
+    def test_startup_time_is_recorded(self):
+        self.assertTrue(self.live_server_startup_time > 0)
+
 
 class TestLiveServer(BaseTestLiveServer):
 
@@ -241,6 +316,555 @@ class TestLiveServerOSPicksPort(BaseTestLiveServer):
         return app
 
 
+class TestLiveServerCustomUrl(BaseTestLiveServer):
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_PORT'] = 0
+        return app
+
+    def get_server_url(self):
+        return 'http://127.0.0.1:%s' % self._port_value.value
+
+
+class TestLiveServerThreadBackend(LiveServerTestCase):
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = 'thread'
+        app.config['LIVESERVER_PORT'] = 0
+
+        @app.route('/shared/')
+        def shared():
+            return app.config.get('SHARED', '')
+
+        return app
+
+    def test_server_runs_in_a_thread(self):
+        self.assertEqual(self._process, None)
+        self.assertTrue(self._server_thread.is_alive())
+
+    def test_server_listening(self):
+        response = urlopen(self.get_server_url())
+        self.assertTrue(b'OK' in response.read())
+        self.assertEqual(response.code, 200)
+
+    def test_server_shares_the_test_process(self):
+        self.app.config['SHARED'] = 'set by the test'
+        response = urlopen(self.get_server_url() + '/shared/')
+        self.assertEqual(response.read(), b'set by the test')
+
+    def test_server_is_shut_down_after_the_test(self):
+        test = TestLiveServerThreadBackend('test_server_listening')
+        test_result = TestResult()
+        test(test_result)
+
+        assert test_result.wasSuccessful()
+        self.assertFalse(test._server_thread.is_alive())
+        self.assertRaises(IOError, urlopen, test.get_server_url())
+
+    def test_unknown_backend(self):
+        class UnknownBackend(TestLiveServerThreadBackend):
+            def create_app(self):
+                app = create_app()
+                app.config['LIVESERVER_BACKEND'] = 'coroutine'
+                return app
+
+        self.assertRaises(ValueError,
+                          UnknownBackend('test_server_listening'),
+                          TestResult())
+
+
+class TestLiveServerStartupFailure(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_failure_is_reported_without_waiting_for_timeout(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1)
+        port = sock.getsockname()[1]
+
+        class PortInUse(BaseTestLiveServer):
+            # Keep the configured port even when run by a parallel worker
+            worker_id = None
+
+            def create_app(self):
+                app = create_app()
+                app.config['LIVESERVER_PORT'] = port
+                app.config['LIVESERVER_TIMEOUT'] = 30
+                return app
+
+        try:
+            with self.assertRaises(RuntimeError) as cm:
+                PortInUse('test_server_listening')(TestResult())
+        finally:
+            sock.close()
+
+        self.assertTrue('Failed to start the server on 127.0.0.1:%d' % port
+                        in str(cm.exception))
+
+    def test_server_process_failure_is_reported(self):
+        def failing_server(app, host, port):
+            raise RuntimeError("can't start")
+
+        class FailingServer(BaseTestLiveServer):
+
+            def create_app(self):
+                app = create_app()
+                app.config['LIVESERVER_PORT'] = 0
+                app.config['LIVESERVER_TIMEOUT'] = 30
+                app.config['LIVESERVER_SERVER_FACTORY'] = failing_server
+                return app
+
+        with self.assertRaises(RuntimeError) as cm:
+            FailingServer('test_server_listening')(TestResult())
+
+        self.assertTrue('exited with code' in str(cm.exception))
+
+
+class _NumberedLiveServer(LiveServerTestCase):
+
+    number = None
+    backend = 'thread'
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = self.backend
+        app.config['LIVESERVER_PORT'] = 0
+        app.config['LIVESERVER_REQUEST_LOG'] = False
+        number = self.number
+
+        @app.route('/number/')
+        def number_view():
+            return str(number)
+
+        return app
+
+    def start(self):
+        self.app = self.create_app()
+        self._configured_port = 0
+        self._port_value = multiprocessing.Value('i', 0)
+        self._spawn_live_server()
+        return self
+
+    def check_number(self):
+        response = urlopen(self.get_server_url() + '/number/')
+        assert response.read() == str(self.number).encode('ascii')
+
+
+def _numbered_live_server(number, backend):
+    cls = type('NumberedLiveServer', (_NumberedLiveServer,),
+               {'number': number, 'backend': backend})
+    return cls('check_number')
+
+
+class TestConcurrentLiveServers(TestCase):
+
+    count = 50
+
+    def create_app(self):
+        return create_app()
+
+    def check_servers(self, servers):
+        try:
+            ports = set(server._port_value.value for server in servers)
+            self.assertEqual(len(ports), self.count)
+            self.assertFalse(0 in ports)
+
+            for server in servers:
+                server.check_number()
+        finally:
+            for server in servers:
+                server._terminate_live_server()
+
+    def test_processes_started_at_once(self):
+        # Each server is usable as soon as it is spawned, so they all start
+        # in parallel.
+        servers = []
+        try:
+            for number in range(self.count):
+                servers.append(_numbered_live_server(number, 'process').start())
+        finally:
+            self.check_servers(servers)
+
+    def test_threads_started_concurrently(self):
+        pool = ThreadPool(10)
+        try:
+            servers = pool.map(
+                lambda number: _numbered_live_server(number, 'thread').start(),
+                range(self.count)
+            )
+        finally:
+            pool.close()
+            pool.join()
+        self.check_servers(servers)
+
+
+class _UnixSocketLiveServer(LiveServerTestCase):
+
+    backend = 'thread'
+    unix_socket = True
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = self.backend
+        app.config['LIVESERVER_UNIX_SOCKET'] = self.unix_socket
+        app.config['LIVESERVER_REQUEST_LOG'] = False
+        return app
+
+    def check_server(self):
+        path = self._get_server_address()
+        assert self.get_server_url().startswith('http+unix://%2F')
+        assert os.path.exists(path)
+        assert self._can_ping_server()
+
+        connection = self.live_connection(timeout=5)
+        try:
+            for _ in range(3):
+                connection.request('GET', '/echo/unix/?page=1')
+                response = connection.getresponse()
+                assert response.status == 200
+                assert json.loads(response.read().decode('utf-8'))['value'] == 'unix'
+        finally:
+            connection.close()
+
+
+class TestLiveServerUnixSocket(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def run_check(self, backend, unix_socket=True):
+        class UnixSocket(_UnixSocketLiveServer):
+            pass
+
+        UnixSocket.backend = backend
+        UnixSocket.unix_socket = unix_socket
+        test = UnixSocket('check_server')
+        result = TestResult()
+        test(result)
+        self.assertTrue(result.wasSuccessful(), result.errors + result.failures)
+        return test
+
+    def test_thread_backend(self):
+        test = self.run_check('thread')
+
+        # The socket and its temporary directory are removed with the server
+        self.assertFalse(os.path.exists(test._unix_socket_dir))
+
+    def test_process_backend(self):
+        test = self.run_check('process')
+
+        self.assertFalse(os.path.exists(test._unix_socket_dir))
+
+    def test_socket_path(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'app.sock')
+            test = self.run_check('thread', path)
+
+            self.assertEqual(test._get_server_address(), path)
+            self.assertFalse(os.path.exists(path))
+        finally:
+            shutil.rmtree(directory)
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+
+    daemon_threads = True
+
+
+def _wsgiref_server(app, host, port):
+    return make_server(host, port, app, server_class=_ThreadingWSGIServer,
+                       handler_class=_QuietWSGIRequestHandler)
+
+
+class _RecordsHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self, logging.INFO)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _ConfiguredLiveServer(LiveServerTestCase):
+
+    backend = 'thread'
+    options = {}
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_BACKEND'] = self.backend
+        app.config['LIVESERVER_PORT'] = 0
+        app.config.update(self.options)
+        return app
+
+    def request(self):
+        return urlopen(self.get_server_url())
+
+    def check_request_log(self):
+        handler = _RecordsHandler()
+        logger = logging.getLogger('werkzeug')
+        # Werkzeug only sets the level of its logger to INFO the first time
+        # it logs, other tests may have reset it since
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        try:
+            self.request().read()
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+
+        server = self._server_thread.server
+        if self.options['LIVESERVER_REQUEST_LOG'] == 'buffered':
+            assert len(server.request_log) == 1, server.request_log
+            assert 'GET / HTTP/1.1' in server.request_log[0]
+        expected = 1 if self.options['LIVESERVER_REQUEST_LOG'] is True else 0
+        assert len(handler.records) == expected, handler.records
+
+    def check_server(self):
+        server = self._server_thread.server
+        response = self.request()
+        assert response.read() == b'OK'
+
+        if 'LIVESERVER_SERVER_FACTORY' in self.options:
+            assert isinstance(server, _ThreadingWSGIServer)
+            return
+
+        if 'LIVESERVER_BACKLOG' in self.options:
+            assert server.request_queue_size == self.options['LIVESERVER_BACKLOG']
+        if self.options.get('LIVESERVER_THREADED') is False:
+            assert not server.multithread
+            assert response.version == 10
+        else:
+            assert server.multithread
+            assert response.version == 11
+
+    def check_process_server(self):
+        assert self.request().read() == b'OK'
+
+    def check_ping(self):
+        assert self._can_ping_server()
+        assert self.request().read() == b'OK'
+
+    def check_server_name(self):
+        host, port = self._server_thread.server.server_address[:2]
+        assert host == '127.0.0.2', host
+        assert self.get_server_url() == 'http://127.0.0.2:%d' % port
+        assert self._can_ping_server()
+
+
+class TestLiveServerOptions(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def run_check(self, name, backend='thread', **options):
+        class Configured(_ConfiguredLiveServer):
+            pass
+
+        Configured.backend = backend
+        Configured.options = options
+        result = TestResult()
+        Configured(name)(result)
+        self.assertTrue(result.wasSuccessful(), result.errors + result.failures)
+
+    def test_request_log(self):
+        for request_log in (True, False, 'buffered'):
+            self.run_check('check_request_log', LIVESERVER_REQUEST_LOG=request_log)
+
+    def test_threaded_server_with_backlog(self):
+        self.run_check('check_server', LIVESERVER_BACKLOG=7,
+                       LIVESERVER_REQUEST_LOG=False)
+
+    def test_single_threaded_server(self):
+        self.run_check('check_server', LIVESERVER_THREADED=False,
+                       LIVESERVER_REQUEST_LOG=False)
+
+    def test_server_factory(self):
+        self.run_check('check_server', LIVESERVER_SERVER_FACTORY=_wsgiref_server)
+
+    def test_ipv6_host(self):
+        if not socket.has_ipv6:
+            self.skipTest("IPv6 is not available")
+        self.run_check('check_ping', LIVESERVER_HOST='::1',
+                       LIVESERVER_REQUEST_LOG=False)
+
+    def test_host_of_server_name(self):
+        # Like app.run, listen on the host of SERVER_NAME by default
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind(('127.0.0.2', 0))
+        except socket.error:
+            self.skipTest("127.0.0.2 is not a loopback address")
+        finally:
+            sock.close()
+
+        self.run_check('check_server_name', SERVER_NAME='127.0.0.2:5000',
+                       LIVESERVER_REQUEST_LOG=False)
+
+    def test_process_backend(self):
+        self.run_check('check_process_server', backend='process',
+                       LIVESERVER_REQUEST_LOG='buffered', LIVESERVER_BACKLOG=16)
+        self.run_check('check_process_server', backend='process',
+                       LIVESERVER_SERVER_FACTORY=_wsgiref_server)
+
+    def test_invalid_options(self):
+        self.assertRaises(ValueError, make_live_server, self.app,
+                          threaded=True, processes=2)
+        self.assertRaises(ValueError, make_live_server, self.app,
+                          request_log='verbose')
+        self.assertRaises(ValueError, make_live_server, self.app,
+                          threaded=False, processes=2, request_log='buffered')
+
+    def test_server_url_of_host(self):
+        test = _ConfiguredLiveServer('check_server')
+        test.app = create_app()
+        test._port_value = multiprocessing.Value('i', 8943)
+
+        for host, url in (('127.0.0.1', 'http://localhost:8943'),
+                          ('0.0.0.0', 'http://localhost:8943'),
+                          ('192.168.0.2', 'http://192.168.0.2:8943'),
+                          ('::1', 'http://[::1]:8943')):
+            test.app.config['LIVESERVER_HOST'] = host
+            self.assertEqual(test.get_server_url(), url)
+
+        # An explicit host takes precedence over SERVER_NAME
+        test.app.config['SERVER_NAME'] = 'example.com:5000'
+        self.assertEqual(test.get_server_url(), 'http://[::1]:8943')
+
+
+def _free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _ignore_sigterm(ready):
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    ready.set()
+    time.sleep(60)
+
+
+class TestLiveServerShutdown(TestCase):
+
+    iterations = 500
+
+    def create_app(self):
+        return create_app()
+
+    def _child_pids(self):
+        pids = []
+        for path in glob.glob('/proc/[0-9]*/stat'):
+            try:
+                with open(path) as stat:
+                    fields = stat.read().rsplit(')', 1)[1].split()
+            except IOError:
+                continue
+            if int(fields[1]) == os.getpid():
+                pids.append(int(path.split('/')[2]))
+        return pids
+
+    def test_shutdown_time_is_recorded(self):
+        test = TestLiveServer('test_server_listening')
+        test(TestResult())
+
+        self.assertTrue(test.live_server_shutdown_time > 0)
+        self.assertFalse(test._process.is_alive())
+        self.assertEqual(test._process.exitcode, 0)
+
+    def test_server_ignoring_terminate_is_killed(self):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=_ignore_sigterm, args=(ready,))
+        process.start()
+        ready.wait(5)
+
+        elapsed = _shutdown_live_server(process, 0.2)
+
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.exitcode, -getattr(signal, 'SIGKILL', 9))
+        self.assertTrue(0.2 <= elapsed < 5)
+
+    def test_stuck_server_thread_is_left_behind(self):
+        app = create_app()
+        entered = threading.Event()
+        released = threading.Event()
+
+        @app.route('/stuck/')
+        def stuck():
+            entered.set()
+            released.wait(5)
+            return 'released'
+
+        server = make_live_server(app, threaded=False, request_log=False)
+        thread = _ServerThread(server)
+        thread.start()
+
+        pool = ThreadPool(1)
+        try:
+            pool.apply_async(
+                urlopen, ('http://127.0.0.1:%d/stuck/' % server.server_port,)
+            )
+            entered.wait(5)
+
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                elapsed = _shutdown_live_server(thread, 0.2)
+        finally:
+            released.set()
+            pool.close()
+            pool.join()
+
+        self.assertTrue(0.2 <= elapsed < 5)
+        self.assertEqual(len(caught), 1)
+        self.assertTrue(issubclass(caught[0].category, RuntimeWarning))
+
+        # Stops once its request is handled
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_repeated_start_and_stop_on_the_same_port(self):
+        if not os.path.isdir('/proc/self/fd'):
+            self.skipTest('requires /proc')
+
+        port = _free_port()
+
+        class SamePort(BaseTestLiveServer):
+            # Keep the configured port even when run by a parallel worker
+            worker_id = None
+
+            def create_app(self):
+                app = create_app()
+                app.config['LIVESERVER_PORT'] = port
+                return app
+
+        # Warm up so resources multiprocessing allocates lazily, such as its
+        # shared memory arena, aren't mistaken for leaks.
+        SamePort('test_server_listening')(TestResult())
+        open_fds = len(os.listdir('/proc/self/fd'))
+
+        for _ in range(self.iterations):
+            test_result = TestResult()
+            SamePort('test_server_listening')(test_result)
+            self.assertTrue(test_result.wasSuccessful(), test_result.errors)
+
+        self.assertEqual(self._child_pids(), [])
+        self.assertEqual(len(os.listdir('/proc/self/fd')), open_fds)
+
+
 class TestNotRenderTemplates(TestCase):
 
     render_templates = False
@@ -259,6 +883,129 @@ class TestNotRenderTemplates(TestCase):
         self.assert_template_used('index.html')
 
 
+class TestRecordedTemplates(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_all_rendered_templates_are_recorded(self):
+        self.client.get("/template/")
+        self.client.get("/other_template/")
+
+        self.assertEqual(len(self.templates), 2)
+        self.assert_template_used("index.html")
+        self.assert_template_used("other.html")
+
+    def test_context_variables_of_all_renders_are_available(self):
+        self.client.get("/template/")
+        self.client.get("/other_template/")
+
+        self.assertEqual(self.get_context_variable("name"), "test")
+        self.assertEqual(self.get_context_variable("other"), "value")
+
+    def test_latest_render_wins(self):
+        self.client.get("/template/")
+        self._add_template(self.app, self.templates[0][0], {"name": "later"})
+
+        self.assertEqual(self.get_context_variable("name"), "later")
+
+    def test_clearing_templates_resets_the_index(self):
+        self.client.get("/template/")
+        self.assert_template_used("index.html")
+
+        del self.templates[:]
+        self.client.get("/other_template/")
+
+        self.assertRaises(AssertionError, self.assert_template_used, "index.html")
+        self.assertRaises(ContextVariableDoesNotExist,
+                          self.get_context_variable, "name")
+
+    def test_custom_template_name_attribute(self):
+        self.client.get("/template/")
+        self.assert_template_used("index.html", tmpl_name_attribute="name")
+        self.assertRaises(AssertionError, self.assert_template_used,
+                          "index.html", tmpl_name_attribute="filename")
+
+
+class TestTemplateNamesOnly(TestCase):
+
+    template_context_capture = None
+
+    def create_app(self):
+        return create_app()
+
+    def test_templates_are_recorded_without_context(self):
+        self.client.get("/template/")
+
+        self.assert_template_used("index.html")
+        self.assertEqual(self.templates[0][1], None)
+
+    def test_context_variables_are_unavailable(self):
+        self.client.get("/template/")
+
+        self.assertRaises(RuntimeError, self.get_context_variable, "name")
+
+
+class _Model(object):
+    pass
+
+
+class TestWeakTemplateContext(TestCase):
+
+    template_context_capture = 'weak'
+
+    def create_app(self):
+        return create_app()
+
+    def test_context_variables_are_available(self):
+        self.client.get("/template/")
+
+        self.assert_template_used("index.html")
+        self.assert_context("name", "test")
+
+    def test_context_does_not_keep_values_alive(self):
+        self.client.get("/template/")
+        model = _Model()
+        self._add_template(self.app, self.templates[0][0], {"model": model})
+
+        self.assertTrue(self.get_context_variable("model") is model)
+
+        del model
+        gc.collect()
+
+        self.assertRaises(ContextVariableDoesNotExist,
+                          self.get_context_variable, "model")
+
+
+class TestDeclaredTemplateContext(TestCase):
+
+    template_context_capture = ("name",)
+
+    def create_app(self):
+        return create_app()
+
+    def test_only_declared_variables_are_recorded(self):
+        self.client.get("/template/")
+
+        self.assertEqual(self.templates[0][1], {"name": "test"})
+        self.assert_context("name", "test")
+
+    def test_undeclared_variables_are_unavailable(self):
+        self.client.get("/other_template/")
+
+        self.assertRaises(ContextVariableDoesNotExist,
+                          self.get_context_variable, "name")
+        self.assertRaises(RuntimeError, self.get_context_variable, "other")
+
+    def test_invalid_capture(self):
+        class InvalidCapture(TestDeclaredTemplateContext):
+            template_context_capture = "name"
+
+        test = InvalidCapture("test_invalid_capture")
+        self.assertRaises(ValueError, test._pre_setup)
+        test._post_teardown()
+
+
 class TestRenderTemplates(TestCase):
 
     render_templates = True
@@ -287,3 +1034,659 @@ class TestRestoreTheRealRender(TestCase):
         response = self.client.get("/template/")
 
         assert len(response.data) > 0
+
+
+class _ClassScopedApp(TestCase):
+
+    create_app_scope = 'class'
+    apps = []
+
+    def create_app(self):
+        app = create_app()
+        app.config['CREATED'] = True
+        return app
+
+    def test_mutate_app(self):
+        self.apps.append(self.app)
+        self.app.config['CREATED'] = False
+        self.app.config['EXTRA'] = 'value'
+        self.app.before_request(lambda: None)
+
+    def test_reuse_app(self):
+        self.apps.append(self.app)
+
+
+class TestCreateAppScope(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_app_is_reused_within_class(self):
+        _ClassScopedApp.apps = []
+        test_result = TestResult()
+        for name in ('test_mutate_app', 'test_reuse_app'):
+            _ClassScopedApp(name)(test_result)
+
+        assert test_result.wasSuccessful()
+
+        first, second = _ClassScopedApp.apps
+        self.assertTrue(first is second)
+
+    def test_state_is_restored_after_each_test(self):
+        _ClassScopedApp.apps = []
+        test_result = TestResult()
+        _ClassScopedApp('test_mutate_app')(test_result)
+
+        assert test_result.wasSuccessful()
+
+        app = _ClassScopedApp.apps[0]
+        self.assertTrue(app.config['CREATED'])
+        self.assertFalse('EXTRA' in app.config)
+        self.assertEqual(app.before_request_funcs.get(None, []), [])
+
+    def test_each_test_gets_a_fresh_client(self):
+        test = _ClassScopedApp('test_reuse_app')
+        test._pre_setup()
+        client = test.client
+        test._post_teardown()
+        test._pre_setup()
+        try:
+            self.assertFalse(test.client is client)
+        finally:
+            test._post_teardown()
+
+    def test_app_is_released_with_its_class(self):
+        if not hasattr(_ClassScopedApp, 'addClassCleanup'):
+            self.skipTest("class cleanups require Python 3.8+")
+
+        class Released(_ClassScopedApp):
+            released = []
+
+            def test_reuse_app(self):
+                super(Released, self).test_reuse_app()
+                app = self.app
+                self._scoped_app.on_release(
+                    lambda: self.released.append(app))
+
+        Released.apps = []
+        test_result = TestResult()
+        unittest.TestSuite([Released('test_mutate_app'),
+                            Released('test_reuse_app')])(test_result)
+
+        self.assertTrue(test_result.wasSuccessful(),
+                        test_result.errors + test_result.failures)
+        self.assertEqual(Released.released, [Released.apps[0]])
+        self.assertFalse(('class', Released) in _scoped_apps)
+
+    def test_unknown_scope(self):
+        class UnknownScope(_ClassScopedApp):
+            create_app_scope = 'request'
+
+        test = UnknownScope('test_reuse_app')
+        self.assertRaises(ValueError, test._pre_setup)
+        test._post_teardown()
+
+
+class TestResponseClassCache(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_response_class_is_reused(self):
+        test = TestSetup('test_setup')
+        test._pre_setup()
+        first = test.app.response_class
+        test._post_teardown()
+        test._pre_setup()
+        try:
+            self.assertTrue(test.app.response_class is first)
+        finally:
+            test._post_teardown()
+
+    def test_original_response_class_is_restored(self):
+        test = TestSetup('test_setup')
+        test._pre_setup()
+        app = test.app
+        test._post_teardown()
+
+        self.assertFalse(issubclass(app.response_class, JsonResponseMixin))
+
+    def test_subclasses_get_their_own_response_class(self):
+        base = self.app.response_class
+        self.assertTrue(issubclass(base, JsonResponseMixin))
+        self.assertTrue(_make_test_response(base) is base)
+
+        original = self._orig_response_class
+
+        class CustomResponse(original):
+            pass
+
+        custom = _make_test_response(CustomResponse)
+        self.assertTrue(issubclass(custom, CustomResponse))
+        self.assertTrue(_make_test_response(CustomResponse) is custom)
+        self.assertFalse(_make_test_response(original) is custom)
+
+
+class _ClassScopedLiveServer(LiveServerTestCase):
+
+    live_server_scope = 'class'
+    processes = []
+    resets = []
+
+    def create_app(self):
+        app = create_app()
+        app.config['LIVESERVER_PORT'] = 0
+        return app
+
+    def reset_live_server(self):
+        self.resets.append(self.id())
+
+    def test_first(self):
+        self.processes.append(self._process)
+        self.assertEqual(urlopen(self.get_server_url()).code, 200)
+
+    def test_second(self):
+        self.processes.append(self._process)
+        self.assertEqual(urlopen(self.get_server_url()).code, 200)
+
+
+class TestLiveServerScope(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def tearDown(self):
+        _release_live_servers()
+
+    def test_server_is_reused_within_class(self):
+        _ClassScopedLiveServer.processes = []
+        _ClassScopedLiveServer.resets = []
+        test_result = TestResult()
+        for name in ('test_first', 'test_second'):
+            _ClassScopedLiveServer(name)(test_result)
+
+        assert test_result.wasSuccessful()
+
+        first, second = _ClassScopedLiveServer.processes
+        self.assertTrue(first is second)
+        self.assertTrue(first.is_alive())
+        self.assertEqual(len(_ClassScopedLiveServer.resets), 1)
+
+    def test_server_is_terminated_once_released(self):
+        _ClassScopedLiveServer.processes = []
+        test_result = TestResult()
+        _ClassScopedLiveServer('test_first')(test_result)
+
+        assert test_result.wasSuccessful()
+        self.assertEqual(len(_live_servers), 1)
+
+        _release_live_servers()
+        process = _ClassScopedLiveServer.processes[0]
+        process.join(5)
+        self.assertFalse(process.is_alive())
+        self.assertEqual(len(_live_servers), 0)
+
+    def test_server_is_terminated_with_its_class(self):
+        if not hasattr(_ClassScopedLiveServer, 'addClassCleanup'):
+            self.skipTest("class cleanups require Python 3.8+")
+
+        _ClassScopedLiveServer.processes = []
+        _ClassScopedLiveServer.resets = []
+        test_result = TestResult()
+        unittest.TestSuite([_ClassScopedLiveServer('test_first'),
+                            _ClassScopedLiveServer('test_second')])(test_result)
+
+        assert test_result.wasSuccessful()
+        self.assertEqual(len(_live_servers), 0)
+        process = _ClassScopedLiveServer.processes[0]
+        process.join(5)
+        self.assertFalse(process.is_alive())
+
+    def test_shared_server_failing_to_start_is_terminated(self):
+        def failing_server(app, host, port):
+            raise RuntimeError("can't start")
+
+        class FailingServer(_ClassScopedLiveServer):
+
+            def create_app(self):
+                app = create_app()
+                app.config['LIVESERVER_UNIX_SOCKET'] = True
+                app.config['LIVESERVER_SERVER_FACTORY'] = failing_server
+                return app
+
+        test = FailingServer('test_first')
+        self.assertRaises(RuntimeError, test, TestResult())
+
+        self.assertEqual(len(_live_servers), 0)
+        self.assertFalse(test._process.is_alive())
+        self.assertFalse(os.path.exists(test._unix_socket_dir))
+
+
+class _GrowingPolicy(GCPolicy):
+
+    rss = 0
+
+    def current_rss(self):
+        _GrowingPolicy.rss += 1000
+        return _GrowingPolicy.rss
+
+
+class _Cycles(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def check_make_cycles(self):
+        for _ in range(10):
+            cycle = []
+            cycle.append(cycle)
+
+    def check_nothing(self):
+        pass
+
+
+class TestGCPolicy(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def _run(self, policy, *names):
+        class Test(_Cycles):
+            run_gc_after_test = policy
+
+        test_result = TestResult()
+        for name in names:
+            Test(name)(test_result)
+        assert test_result.wasSuccessful()
+
+    def test_young_generations_are_collected(self):
+        gc.collect()
+        policy = GCPolicy(generation=0)
+        self._run(policy, 'check_make_cycles')
+
+        stat, = policy.stats
+        self.assertTrue(stat['test'].endswith('check_make_cycles'))
+        self.assertEqual(stat['generation'], 0)
+        self.assertTrue(stat['collected'] >= 10)
+        self.assertEqual(stat['uncollectable'], 0)
+
+    def test_full_collection_every_n_tests(self):
+        policy = GCPolicy(generation=0, full_every=2)
+        self._run(policy, 'check_nothing', 'check_nothing', 'check_nothing',
+                  'check_nothing')
+
+        self.assertEqual(policy.tests, 4)
+        self.assertEqual([stat['generation'] for stat in policy.stats],
+                         [0, 2, 0, 2])
+
+    def test_full_collection_past_rss_threshold(self):
+        policy = _GrowingPolicy(generation=1, rss_threshold=1500)
+        self._run(policy, 'check_nothing', 'check_nothing', 'check_nothing')
+
+        # The baseline is taken when the first test starts and again after
+        # each full collection.
+        self.assertEqual([stat['generation'] for stat in policy.stats],
+                         [1, 2, 1])
+
+    def test_most_collected(self):
+        gc.collect()
+        policy = GCPolicy(generation=0)
+        self._run(policy, 'check_nothing', 'check_make_cycles')
+
+        worst = policy.most_collected(count=1)
+        self.assertEqual(len(worst), 1)
+        self.assertTrue(worst[0]['test'].endswith('check_make_cycles'))
+
+    def test_freeze(self):
+        if not hasattr(gc, 'freeze'):
+            self.skipTest("gc.freeze requires Python 3.7")
+
+        policy = GCPolicy(freeze=True)
+        try:
+            self._run(policy, 'check_nothing')
+            frozen = gc.get_freeze_count()
+            self.assertTrue(frozen > 0)
+
+            # Only the first test freezes
+            self._run(policy, 'check_nothing')
+            self.assertEqual(gc.get_freeze_count(), frozen)
+        finally:
+            gc.unfreeze()
+
+
+class TestLazyRequestContext(TestCase):
+
+    lazy_request_context = True
+
+    def create_app(self):
+        app = create_app()
+        app.secret_key = 'secret'
+        return app
+
+    def test_context_is_not_built_until_used(self):
+        self.client.get("/")
+
+        self.assertTrue(has_request_context())
+        self.assertTrue(self._ctx.ctx is None)
+
+    def test_context_is_built_on_first_use(self):
+        self.assertEqual(request.path, '/')
+        self.assertTrue(self._ctx.ctx is not None)
+        self.assertEqual(url_for('index'), '/')
+
+        session['key'] = 'value'
+        self.assertEqual(session['key'], 'value')
+
+    def test_client_requests_use_their_own_context(self):
+        self.assertEqual(request.path, '/')
+
+        response = self.client.get("/oh-no/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(request.path, '/')
+
+    def test_app_context_is_pushed(self):
+        self.assertTrue(current_app._get_current_object() is self.app)
+        g.value = 'value'
+        self.assertEqual(g.value, 'value')
+
+    def test_contexts_are_popped(self):
+        outer = request._get_current_object()
+
+        test = TestSetup('test_setup')
+        test.lazy_request_context = True
+        test._pre_setup()
+        self.assertFalse(request._get_current_object() is outer)
+        test._post_teardown()
+
+        self.assertTrue(request._get_current_object() is outer)
+        self.assertTrue(current_app._get_current_object() is self.app)
+
+    def test_context_is_built_inside_session_transaction(self):
+        class Lazy(TestLazyRequestContext):
+            def check_session_transaction(self):
+                with self.client.session_transaction() as sess:
+                    sess['key'] = 'value'
+                    self.assertEqual(request.path, '/')
+                self.assertTrue(_request_ctx_stack.top is self._ctx)
+
+        result = TestResult()
+        Lazy('check_session_transaction')(result)
+        self.assertEqual(result.errors + result.failures, [])
+        self.assertEqual(result.testsRun, 1)
+
+    def test_teardown_request_once_built(self):
+        torn_down = []
+
+        class Lazy(TestLazyRequestContext):
+            def create_app(self):
+                app = super(Lazy, self).create_app()
+                app.teardown_request(
+                    lambda exc: torn_down.append(request.path))
+                return app
+
+            def check_nothing(self):
+                pass
+
+            def check_request(self):
+                self.assertEqual(request.path, '/')
+
+        result = TestResult()
+        unittest.TestSuite([Lazy('check_nothing'),
+                            Lazy('check_request')])(result)
+        self.assertEqual(result.errors + result.failures, [])
+        self.assertEqual(torn_down, ['/'])
+
+
+class TestRequestContextEnviron(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_context_matches_test_request_context(self):
+        expected = self.app.test_request_context().request
+        self.assertEqual(request.url, expected.url)
+        self.assertEqual(request.method, expected.method)
+
+    def test_environ_is_not_shared(self):
+        request.environ['custom'] = 'value'
+        other = _make_request_context(self.app)
+
+        self.assertFalse('custom' in other.request.environ)
+        self.assertFalse(other.request.environ['wsgi.input']
+                         is request.environ['wsgi.input'])
+
+    def test_environ_follows_config(self):
+        self.app.config['SERVER_NAME'] = 'example.com'
+        ctx = _make_request_context(self.app)
+
+        self.assertEqual(ctx.request.url, 'http://example.com/')
+
+
+class TestSignalDispatcher(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_receivers_are_connected_once(self):
+        receivers = len(template_rendered.receivers)
+
+        test = TestSetup('test_setup')
+        test._pre_setup()
+        try:
+            self.assertEqual(len(template_rendered.receivers), receivers)
+        finally:
+            test._post_teardown()
+
+    def test_other_apps_are_ignored(self):
+        other = create_app()
+        other.test_client().get("/template/")
+        other.test_client().get("/flash/")
+
+        self.assertEqual(self.templates, [])
+        self.assertEqual(self.flashed_messages, [])
+
+    def test_nested_tests_with_the_same_app(self):
+        test = TestSetup('test_setup')
+        test.create_app = lambda: self.app
+        test._pre_setup()
+        try:
+            self.client.get("/template/")
+            self.assertEqual(len(test.templates), 1)
+            self.assertEqual(self.templates, [])
+        finally:
+            test._post_teardown()
+
+        self.client.get("/template/")
+        self.assertEqual(len(self.templates), 1)
+
+
+class TestClientBatch(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_responses_keep_the_order_of_requests(self):
+        responses = self.client_batch([
+            "/", ("GET", "/oh-no/"), "/redirect/?code=302", "/forbidden/",
+        ])
+
+        self.assertEqual([response.request for response in responses],
+                         ["/", ("GET", "/oh-no/"), "/redirect/?code=302",
+                          "/forbidden/"])
+        self.assert200(responses[0])
+        self.assertEqual(responses[0].data, b"OK")
+        self.assert404(responses[1])
+        self.assertStatus(responses[2], 302)
+        self.assertRedirects(responses[2], "/")
+        self.assert403(responses[3])
+
+    def test_requests_are_built_like_the_client(self):
+        responses = self.client_batch([
+            ("POST", "/echo/a%20b/?page=2&sort=name"),
+            {"path": "/echo/c/", "method": "POST", "data": "payload",
+             "query_string": {"page": "3"}},
+        ])
+
+        self.assertEqual(responses[0].json, {
+            "method": "POST", "value": "a b", "data": "",
+            "args": {"page": "2", "sort": "name"}, "cookie": None,
+        })
+        self.assertEqual(responses[1].json["value"], "c")
+        self.assertEqual(responses[1].json["data"], "payload")
+        self.assertEqual(responses[1].json["args"], {"page": "3"})
+
+    def test_client_cookies_are_sent(self):
+        self.client.set_cookie("localhost", "name", "value")
+        responses = self.client_batch(["/echo/a/", {"path": "/echo/b/"}])
+
+        self.assertEqual([response.json["cookie"] for response in responses],
+                         ["value", "value"])
+
+    def test_threaded_batch(self):
+        paths = ["/echo/%d/" % i for i in range(50)]
+        responses = self.client_batch(paths, workers=4)
+
+        self.assertEqual([response.json["value"] for response in responses],
+                         [str(i) for i in range(50)])
+
+    def test_body_is_decoded_lazily(self):
+        response, = self.client_batch(["/ndjson/"])
+
+        self.assertFalse("data" in response.__dict__)
+        self.assertFalse(response.is_json)
+        self.assertEqual(len(list(response.iter_json_lines())), 3)
+        self.assertTrue(response.get_data(as_text=True).startswith('{"id": 0}'))
+
+
+class TestCollectionAssertions(TestCase):
+
+    def create_app(self):
+        return create_app()
+
+    def test_all_status(self):
+        self.assertAllStatus(self.client_batch(["/", "/ajax/"]), 200)
+        self.assertAllStatus([self.client.get("/oops/")], 404)
+        self.assertAllStatus([], 200)
+
+    def test_all_status_failures_are_grouped(self):
+        responses = self.client_batch(
+            ["/"] * 5 + ["/oops/", "/forbidden/", "/oh-no/"]
+        )
+        try:
+            self.assertAllStatus(responses, 200)
+        except AssertionError as e:
+            message = str(e)
+        else:
+            self.fail("assertAllStatus didn't fail")
+
+        self.assertTrue("3 of 8 responses didn't have HTTP status 200" in message)
+        self.assertTrue("  403 (1): #6 '/forbidden/'" in message)
+        self.assertTrue("  404 (2): #5 '/oops/', #7 '/oh-no/'" in message)
+
+    def test_all_status_limits_listed_responses(self):
+        responses = [self.client.get("/oops/") for _ in range(12)]
+        try:
+            self.assertAllStatus(responses, 200)
+        except AssertionError as e:
+            self.assertTrue("404 (12): #0, #1" in str(e))
+            self.assertTrue("#9, ... 2 more" in str(e))
+        else:
+            self.fail("assertAllStatus didn't fail")
+
+    def test_all_status_custom_message(self):
+        try:
+            self.assertAllStatus([self.client.get("/oops/")], 200, "custom")
+        except AssertionError as e:
+            self.assertEqual(str(e), "custom")
+        else:
+            self.fail("assertAllStatus didn't fail")
+
+    def test_all_redirects(self):
+        self.assertAllRedirects(
+            self.client_batch(["/redirect/", "/redirect/?code=302"]), "/"
+        )
+
+    def test_all_redirects_failures_are_grouped(self):
+        responses = self.client_batch(
+            ["/redirect/", "/", "/external_redirect/"]
+        )
+        try:
+            self.assertAllRedirects(responses, "/")
+        except AssertionError as e:
+            message = str(e)
+        else:
+            self.fail("assertAllRedirects didn't fail")
+
+        self.assertTrue("2 of 3 responses weren't redirects to "
+                        "http://localhost/:" in message)
+        self.assertTrue("  200 (1): #1 '/'" in message)
+        self.assertTrue("  302 to http://flask.pocoo.org/ (1): "
+                        "#2 '/external_redirect/'" in message)
+
+
+class TestRequestTimings(TestCase):
+
+    def create_app(self):
+        app = create_app()
+        self.queries = 0
+
+        @app.before_request
+        def query():
+            self.queries += 1
+
+        return app
+
+    def count_queries(self):
+        return self.queries
+
+    def test_responses_are_timed(self):
+        response = self.client.get("/")
+
+        self.assertTrue(response.elapsed > 0)
+        self.assertTrue(response.cpu_time >= 0)
+        self.assertEqual(response.query_count, 1)
+
+    def test_queries_are_not_counted_by_default(self):
+        self.assertEqual(TestCase.count_queries(self), None)
+
+    def test_faster_than(self):
+        response = self.client.get("/")
+
+        self.assertFasterThan(response, 10)
+        self.assertFasterThan(response, 10, cpu=True)
+        self.assertRaises(AssertionError, self.assertFasterThan, response, 0)
+        self.assertRaises(RuntimeError, self.assertFasterThan,
+                          self.client_batch(["/"])[0], 10)
+
+    def test_request_time_budget(self):
+        self.request_time_budget = 0
+        try:
+            self.client.get("/echo/value/")
+        except AssertionError as e:
+            self.assertTrue("GET /echo/<value>/ took" in str(e))
+            self.assertTrue("over the request_time_budget of 0.00ms" in str(e))
+        else:
+            self.fail("request_time_budget wasn't enforced")
+
+    def test_endpoints_are_aggregated(self):
+        def requests():
+            stats = request_timings.endpoints.get("GET /echo/<value>/")
+            return stats['requests'] if stats else 0
+
+        before = requests()
+        self.client.get("/echo/a/")
+        self.client.get("/echo/b/")
+
+        self.assertEqual(requests(), before + 2)
+
+    def test_redirects_are_followed(self):
+        redirects = request_timings.endpoints.get("GET /redirect/", {})
+        before = redirects.get('requests', 0)
+
+        response = self.client.get("/redirect/", follow_redirects=True)
+
+        self.assertEqual(response.data, b"OK")
+        self.assertTrue(response.elapsed > 0)
+        self.assertEqual(
+            request_timings.endpoints["GET /redirect/"]['requests'], before + 1
+        )